@@ -1,124 +1,89 @@
-import tkinter as tk
-from tkinter import filedialog, scrolledtext, ttk
-import pandas as pd
 import os
-from datetime import datetime, timedelta
-import numpy as np
-import random
-import customtkinter as ctk
-from PIL import Image, ImageTk
-import io
-import threading
 import time
+import numpy as np
+from sldp import JobManager, Preview
 
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
-
-def monte_carlo_interpolation(value1, value2, num_simulations=1000):
-    base_value = (value1 + value2) / 2
-    std_dev = abs(value2 - value1) * 0.1
-    simulations = np.random.normal(base_value, std_dev, num_simulations)
-    return float(np.mean(simulations))
+# How often the GUI drains the job manager's events (~20 frames per second)
+STATUS_REFRESH_MS = 50
+# Jobs run one at a time by default; each one runs in its own worker process
+JOB_WORKERS = 1
+# Preview plot: canvas height, smallest visible time span (ns) and zoom step per wheel notch
+PREVIEW_HEIGHT = 220
+PREVIEW_MIN_SPAN = 10 * 60 * 10**9
+PREVIEW_ZOOM = 1.25
 
-def process_sea_level_data(input_file_path, output_folder, status_box, progress_bar=None, progress_label=None, start_button=None):
-    def update_progress(value, text):
+def show_jobs(root, jobs, status_box, job_rows, progress_bar=None, progress_label=None, on_complete=None):
+    # Drains the job manager on the Tk event loop for as long as the window lives.
+    # With the timing option on, stage timings end up in the status box and in sldp-timing.json.
+    def show_message(job, text, level):
+        status_box.insert("end", f"[Job {job.id}] {text}\n", level)
+        status_box.see("end")
+    
+    def update_job(job):
+        if job.id in job_rows:
+            job_rows[job.id](job)
         if progress_bar:
-            progress_bar.set(value)
+            progress_bar.set(job.fraction)
         if progress_label:
-            progress_label.configure(text=text)
-    
-    try:
-        status_box.insert(tk.END, "Treatment started...\n", "info")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(0.05, "Loading data...")
-        
-        data = pd.read_csv(input_file_path, sep='\t', header=None, names=['timestamp', 'sea_level'])
-        status_box.insert(tk.END, f"Data loaded successfully. Found {len(data)} data points.\n", "success")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(0.15, "Processing timestamps...")
-        
-        data['timestamp'] = pd.to_datetime(data['timestamp'])
-        data['check'] = 'OK'
-        update_progress(0.25, "Checking for time gaps...")
-        
-        new_rows = []
-        status_box.insert(tk.END, "Checking for time gaps and interpolating using Monte Carlo method...\n", "info")
-        status_box.see(tk.END)
-        status_box.update()
-        
-        total_rows = len(data) - 1
-        for i in range(total_rows):
-            if i % max(1, int(total_rows/20)) == 0:
-                update_progress(0.25 + (i/total_rows*0.35), f"Interpolating: {i}/{total_rows}")
-                
-            current_time = data.iloc[i]['timestamp']
-            next_time = data.iloc[i + 1]['timestamp']
-
-            if next_time - current_time == timedelta(minutes=2):
-                missing_time = current_time + timedelta(minutes=1)
-                interpolated_level = monte_carlo_interpolation(
-                    data.iloc[i]['sea_level'], 
-                    data.iloc[i + 1]['sea_level']
-                )
-                new_rows.append({'timestamp': missing_time, 'sea_level': interpolated_level, 'check': 'Interpolated'})
-
-        data = pd.concat([data, pd.DataFrame(new_rows)], ignore_index=True)
-        data = data.sort_values('timestamp')
-        status_box.insert(tk.END, f"Interpolated {len(new_rows)} data points using Monte Carlo simulation.\n", "success")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(0.65, "Identifying segments...")
-        
-        segments = []
-        current_segment = [data.iloc[0]]
-        status_box.insert(tk.END, "Identifying segments...\n", "info")
-        status_box.see(tk.END)
-        status_box.update()
+            progress_label.configure(text=f"Job {job.id}: {job.text}")
+        if job.state == "completed":
+            animate_completion(status_box, f"completion-{job.id}")
+            if on_complete:
+                on_complete(job)
+        elif job.state == "failed":
+            status_box.insert("end", f"[Job {job.id}] Error during processing: {job.error}\n", "error")
+            status_box.insert("end", f"[Job {job.id}] Resume it to continue from its last finished stage.\n", "info")
+        elif job.state == "cancelled":
+            status_box.insert("end", f"[Job {job.id}] Cancelled; resume it to continue from its last finished stage.\n", "warning")
+        status_box.see("end")
+    
+    def poll():
+        # Everything reported since the last frame is shown in one redraw; a failing
+        # callback must not stop the polling
+        try:
+            jobs.pump(show_message, update_job)
+        finally:
+            root.after(STATUS_REFRESH_MS, poll)
+    
+    poll()
 
-        for i in range(1, len(data)):
-            if data.iloc[i]['timestamp'] - data.iloc[i - 1]['timestamp'] > timedelta(minutes=2):
-                segments.append(pd.DataFrame(current_segment))
-                current_segment = []
-            current_segment.append(data.iloc[i])
+def format_epoch(value):
+    return str(np.datetime64(int(value), "ns").astype("datetime64[m]")).replace("T", " ")
 
-        if current_segment:
-            segments.append(pd.DataFrame(current_segment))
+def draw_preview(canvas, preview, start, stop):
+    # Only the visible range is read, at the pyramid level that matches the canvas width
+    canvas.delete("all")
+    width, height = max(canvas.winfo_width(), 2), max(canvas.winfo_height(), 2)
+    top, bottom = 10, height - 22
+    scale = width / max(stop - start, 1)
+    
+    # Segments are shaded in alternating bands, the gaps between them in red
+    numbers, seg_start, seg_stop = preview.segments(start, stop)
+    x0 = np.clip((seg_start - start) * scale, 0, width).astype(int)
+    x1 = np.clip((seg_stop - start) * scale, 0, width).astype(int)
+    first = np.concatenate(([True], x0[1:] != x0[:-1]))
+    for number, left, right in zip(numbers[first], x0[first], x1[first]):
+        canvas.create_rectangle(left, top, max(right, left + 1), bottom, width=0,
+                                fill="#24324a" if number % 2 else "#1f2a3d")
+    for left, right in zip(x1[:-1], x0[1:]):
+        if right > left:
+            canvas.create_rectangle(left, top, right, bottom, width=0, fill="#5a1e1e")
+    
+    x, low, high, interpolated = preview.columns(start, stop, width)
+    if len(x):
+        y_min, y_max = float(low.min()), float(high.max())
+        y_scale = (bottom - top) / (y_max - y_min) if y_max > y_min else 0.0
+        y_low = bottom - (low - y_min) * y_scale
+        y_high = np.minimum(bottom - (high - y_min) * y_scale, y_low - 1)
+        for column, y0, y1, filled in zip(x, y_low, y_high, interpolated):
+            canvas.create_line(column, y0, column, y1, fill="#ff8c00" if filled else "#6a9eda")
+        canvas.create_text(4, top, text=f"{y_max:.3f}", anchor="nw", fill="#aaaaaa", font=("Consolas", 9))
+        canvas.create_text(4, bottom, text=f"{y_min:.3f}", anchor="sw", fill="#aaaaaa", font=("Consolas", 9))
+    canvas.create_text(4, height - 4, text=format_epoch(start), anchor="sw", fill="#aaaaaa", font=("Consolas", 9))
+    canvas.create_text(width - 4, height - 4, text=format_epoch(stop), anchor="se", fill="#aaaaaa",
+                       font=("Consolas", 9))
 
-        status_box.insert(tk.END, f"Identified {len(segments)} segments.\n", "success")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(0.75, "Saving segments...")
-        
-        for i, segment in enumerate(segments):
-            update_progress(0.75 + ((i+1)/len(segments)*0.2), f"Saving segment {i+1}/{len(segments)}")
-            
-            output_file = os.path.join(output_folder, f"segment_{i + 1}.xlsx")
-            segment.to_excel(output_file, index=False)
-            message = f"Saved segment {i + 1} with {len(segment)} data points to {output_file}\n"
-            status_box.insert(tk.END, message, "success")
-            status_box.see(tk.END)
-            status_box.update()
-        
-        status_box.insert(tk.END, "Treatment completed successfully!\n", "complete")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(1.0, "Completed")
-        
-        animate_completion(status_box)
-        
-    except Exception as e:
-        status_box.insert(tk.END, f"Error during processing: {str(e)}\n", "error")
-        status_box.see(tk.END)
-        status_box.update()
-        update_progress(0, "Failed")
-    
-    finally:
-        if start_button:
-            start_button.configure(state="normal")
-
-def animate_completion(status_box):
+def animate_completion(status_box, tag, frame_index=0):
     completion_frames = [
         "🌊 ░░░░░░░░░░ 🌊",
         "🌊 ▓░░░░░░░░░ 🌊",
@@ -134,15 +99,33 @@ def animate_completion(status_box):
         "✨ COMPLETED ✨"
     ]
     
-    for frame in completion_frames:
-        status_box.insert(tk.END, f"\r{frame}", "complete")
-        status_box.see(tk.END)
-        status_box.update()
-        time.sleep(0.12)
-        if frame != completion_frames[-1]:
-            status_box.delete("end-2c linestart", "end-1c")
+    # Frames are scheduled on the Tk event loop instead of sleeping in it. Each frame
+    # replaces the line tagged ``tag``, so lines logged in between are left alone.
+    if frame_index == 0:
+        status_box.insert("end", f"{completion_frames[0]}\n", ("complete", tag))
+        status_box.see("end")
+    else:
+        ranges = status_box.tag_ranges(tag)
+        if not ranges:  # the log was cleared meanwhile
+            return
+        start = str(ranges[0])
+        status_box.delete(start, ranges[-1])
+        status_box.insert(start, f"{completion_frames[frame_index]}\n", ("complete", tag))
+    if frame_index < len(completion_frames) - 1:
+        status_box.after(120, animate_completion, status_box, tag, frame_index + 1)
+    else:
+        status_box.tag_delete(tag)
 
 def create_gui():
+    # The GUI toolkits are only imported once a window is built, so the processing
+    # code can be used without a display stack
+    import tkinter as tk
+    from tkinter import filedialog, scrolledtext
+    import customtkinter as ctk
+
+    ctk.set_appearance_mode("dark")
+    ctk.set_default_color_theme("blue")
+
     root = ctk.CTk()
     root.title("Sea Level Data Processor")
     root.attributes('-fullscreen', True)
@@ -162,6 +145,13 @@ def create_gui():
     is_dark_mode = tk.BooleanVar(value=True)
     input_path = tk.StringVar()
     output_path = tk.StringVar()
+    # Optional outputs of each run, off by default as on the command line
+    run_options = {
+        "preview": ("Preview plot", tk.BooleanVar(value=False)),
+        "products": ("Hourly/daily means and tidal extrema", tk.BooleanVar(value=False)),
+        "profile": ("Stage timing report", tk.BooleanVar(value=False)),
+        "result_cache": ("Reuse results of unchanged inputs", tk.BooleanVar(value=False)),
+    }
     
     def animate_theme_transition(from_dark, to_dark):
         steps = 10
@@ -404,7 +394,7 @@ def create_gui():
     
     # Output directory selection
     output_frame = ctk.CTkFrame(selection_frame, fg_color="transparent")
-    output_frame.pack(fill=tk.X, padx=15, pady=(5, 15))
+    output_frame.pack(fill=tk.X, padx=15, pady=(5, 5))
     
     output_label = ctk.CTkLabel(
         output_frame, 
@@ -440,6 +430,105 @@ def create_gui():
     )
     output_button.pack(side=tk.RIGHT)
     
+    # Run options, applied to the jobs queued from now on
+    options_frame = ctk.CTkFrame(selection_frame, fg_color="transparent")
+    options_frame.pack(fill=tk.X, padx=15, pady=(5, 15))
+    
+    options_label = ctk.CTkLabel(
+        options_frame, 
+        text="Options:", 
+        font=ctk.CTkFont(size=14, weight="bold"),
+        width=120,
+        anchor="w"
+    )
+    options_label.pack(side=tk.LEFT, padx=(5, 10))
+    
+    for label, variable in run_options.values():
+        ctk.CTkCheckBox(options_frame, text=label, variable=variable).pack(side=tk.LEFT, padx=(0, 20))
+    
+    # Preview section: the last completed job, zoomable without reading the segment files
+    preview_frame = ctk.CTkFrame(content_frame, corner_radius=15)
+    preview_frame.pack(fill=tk.X, pady=(0, 20), padx=10)
+    
+    preview_title = ctk.CTkLabel(
+        preview_frame,
+        text="Preview",
+        font=ctk.CTkFont(size=16, weight="bold"),
+        anchor="w"
+    )
+    preview_title.pack(fill=tk.X, padx=15, pady=(15, 0))
+    
+    preview_info = ctk.CTkLabel(
+        preview_frame,
+        text="Completed jobs run with 'Preview plot' are plotted here. Scroll to zoom, drag to pan, "
+             "double-click to show everything.",
+        anchor="w",
+        text_color="#888888"
+    )
+    preview_info.pack(fill=tk.X, padx=15, pady=(0, 5))
+    
+    preview_canvas = tk.Canvas(preview_frame, height=PREVIEW_HEIGHT, bg="#1a1a1a", highlightthickness=0)
+    preview_canvas.pack(fill=tk.X, padx=15, pady=(0, 15))
+    
+    preview_view = {"preview": None, "start": 0, "stop": 0, "drag": None}
+    
+    def redraw_preview(event=None):
+        if preview_view["preview"] is not None:
+            draw_preview(preview_canvas, preview_view["preview"], preview_view["start"], preview_view["stop"])
+    
+    def set_preview_range(start, stop):
+        first, last = preview_view["preview"].span
+        span = min(max(stop - start, PREVIEW_MIN_SPAN), last - first)
+        start = min(max(start, first), last - span)
+        preview_view["start"], preview_view["stop"] = start, start + span
+        redraw_preview()
+    
+    def show_preview(job):
+        if not job.summary or not job.summary.get("preview"):
+            return
+        try:
+            preview = Preview(job.output_folder)
+        except (OSError, ValueError) as e:
+            status_box.insert("end", f"[Job {job.id}] Could not open the preview: {e}\n", "warning")
+            return
+        if preview.span is None:
+            status_box.insert("end", f"[Job {job.id}] No data points to preview.\n", "warning")
+            return
+        preview_view["preview"] = preview
+        preview_info.configure(text=f"Job {job.id}: {os.path.basename(job.input)} - {preview.meta['rows']} data points "
+                                    f"in {preview.meta['segments']} segments. Scroll to zoom, drag to pan, "
+                                    f"double-click to show everything.")
+        set_preview_range(*preview.span)
+    
+    def zoom_preview(event, factor):
+        if preview_view["preview"] is None:
+            return
+        start, stop = preview_view["start"], preview_view["stop"]
+        anchor = start + (stop - start) * event.x / max(preview_canvas.winfo_width(), 1)
+        set_preview_range(int(anchor - (anchor - start) * factor), int(anchor + (stop - anchor) * factor))
+    
+    def start_drag(event):
+        preview_view["drag"] = (event.x, preview_view["start"], preview_view["stop"])
+    
+    def drag_preview(event):
+        if preview_view["preview"] is None or preview_view["drag"] is None:
+            return
+        x, start, stop = preview_view["drag"]
+        shift = int((x - event.x) * (stop - start) / max(preview_canvas.winfo_width(), 1))
+        set_preview_range(start + shift, stop + shift)
+    
+    def reset_preview(event):
+        if preview_view["preview"] is not None:
+            set_preview_range(*preview_view["preview"].span)
+    
+    preview_canvas.bind("<Configure>", redraw_preview)
+    preview_canvas.bind("<MouseWheel>", lambda event: zoom_preview(event, 1 / PREVIEW_ZOOM if event.delta > 0 else PREVIEW_ZOOM))
+    preview_canvas.bind("<Button-4>", lambda event: zoom_preview(event, 1 / PREVIEW_ZOOM))
+    preview_canvas.bind("<Button-5>", lambda event: zoom_preview(event, PREVIEW_ZOOM))
+    preview_canvas.bind("<ButtonPress-1>", start_drag)
+    preview_canvas.bind("<B1-Motion>", drag_preview)
+    preview_canvas.bind("<Double-Button-1>", reset_preview)
+    
     # Status and output section
     status_frame = ctk.CTkFrame(content_frame, corner_radius=15)
     status_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
@@ -484,6 +573,51 @@ def create_gui():
     status_box.insert(tk.END, "Ready to start!\n" , "success")
     status_box.insert(tk.END, "Please select the input file and output directory to begin processing \u21D1\n", "info")
     
+    # Job queue: one row per job with its progress and a cancel/resume button
+    jobs = JobManager(workers=JOB_WORKERS)
+    job_rows = {}
+    
+    jobs_frame = ctk.CTkScrollableFrame(status_frame, height=110, label_text="Jobs")
+    jobs_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+    
+    def add_job_row(job):
+        row = ctk.CTkFrame(jobs_frame, fg_color="transparent")
+        row.pack(fill=tk.X, pady=2)
+        
+        name_label = ctk.CTkLabel(row, text=f"Job {job.id}: {os.path.basename(job.input)}", width=260, anchor="w")
+        name_label.pack(side=tk.LEFT, padx=(5, 10))
+        
+        job_button = ctk.CTkButton(row, text="Cancel", width=90, height=28, fg_color="#555555", hover_color="#444444")
+        job_button.pack(side=tk.RIGHT, padx=(10, 5))
+        
+        state_label = ctk.CTkLabel(row, text=job.text, width=180, anchor="e")
+        state_label.pack(side=tk.RIGHT, padx=(10, 0))
+        
+        job_progress = ctk.CTkProgressBar(row, height=10, corner_radius=5)
+        job_progress.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        job_progress.set(0)
+        
+        def cancel_or_resume():
+            if job.finished:
+                jobs.resume(job.id)
+                status_box.insert("end", f"[Job {job.id}] Resumed.\n", "info")
+            else:
+                jobs.cancel(job.id)
+            update_row(job)
+        
+        def update_row(job):
+            job_progress.set(job.fraction)
+            state_label.configure(text=job.text)
+            if job.state == "completed":
+                job_button.configure(state="disabled", text="Done")
+            elif job.finished:
+                job_button.configure(text="Resume", fg_color=ACCENT_COLOR)
+            else:
+                job_button.configure(text="Cancel", fg_color="#555555")
+        
+        job_button.configure(command=cancel_or_resume)
+        job_rows[job.id] = update_row
+    
     # Progress section
     progress_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
     progress_frame.pack(fill=tk.X, pady=(0, 10), padx=10)
@@ -514,9 +648,8 @@ def create_gui():
             return
         
         # Update UI to show processing state
-        start_button.configure(state="disabled")
         progress.set(0)  # Reset progress
-        progress_label.configure(text="Starting...")
+        progress_label.configure(text="Queued")
         
         if not os.path.exists(out_path):
             try:
@@ -527,16 +660,16 @@ def create_gui():
                 status_box.insert(tk.END, f"Error creating output directory: {str(e)}\n", "error")
                 status_box.see(tk.END)
                 progress_label.configure(text="Failed")
-                start_button.configure(state="normal")
                 return
         
-        # Use threading to prevent UI freezing during processing
-        processing_thread = threading.Thread(
-            target=process_sea_level_data,
-            args=(in_path, out_path, status_box, progress, progress_label, start_button)
-        )
-        processing_thread.daemon = True
-        processing_thread.start()
+        # Jobs run in worker processes so the UI never freezes; more can be queued meanwhile
+        options = {name: variable.get() for name, (_, variable) in run_options.items()}
+        job = jobs.submit(in_path, out_path, **options)
+        add_job_row(job)
+        status_box.insert("end", f"[Job {job.id}] Queued {os.path.basename(in_path)}.\n", "info")
+        status_box.see("end")
+    
+    show_jobs(root, jobs, status_box, job_rows, progress, progress_label, show_preview)
     
     # Create a stylish Start button with pulsating animation
     start_button = ctk.CTkButton(
@@ -570,14 +703,20 @@ def create_gui():
     )
     clear_button.pack(side=tk.LEFT, padx=5)
     
-    # Exit button
+    # Exit button: running jobs are cancelled, their checkpoints stay for a later run
+    def exit_app():
+        jobs.shutdown()
+        root.destroy()
+    
+    root.protocol("WM_DELETE_WINDOW", exit_app)
+    
     exit_button = ctk.CTkButton(
         button_frame, 
         text="Exit", 
         font=ctk.CTkFont(size=15),
         height=45,
         corner_radius=10,
-        command=root.destroy,
+        command=exit_app,
         fg_color=ERROR_COLOR,
         hover_color="#8b0000"
     )
@@ -0,0 +1,24 @@
+__version__ = '2.0'
+
+from .series import FLAG_LABELS, SeaLevelSeries
+from .gaps import find_gaps, fill_gaps, fill_series, infer_interval
+from .interpolation import (INTERPOLATORS, Interpolator, MonteCarloInterpolator, LinearInterpolator,
+                            CubicSplineInterpolator, HarmonicInterpolator, make_interpolator,
+                            monte_carlo_interpolation)
+from .segments import segment_bounds, iter_segments
+from .qc import QC_ACTIONS, quality_control, rolling_spikes, flatline_runs
+from .progress import ProgressReporter, ProgressChannel, logging_reporter
+from .products import PRODUCTS, period_means, tidal_extrema, write_products
+from .preview import Preview, build_pyramid, write_preview
+from .profiling import PROFILE_TOOLS, StageTimer, format_timing
+from .catalog import CATALOG_FORMATS, segment_catalog, write_catalog, read_catalog
+from .export import OUTPUT_FORMATS, SegmentWriter, export_segments
+from .stream import SegmentStream, process_file_streaming
+from .incremental import process_file_incremental
+from .archive import StationArchive, build_archive, write_archive
+from .loader import detect_timestamp_format, parse_timestamps, load_data, load_series
+from .pipeline import process_file
+from .batch import collect_inputs, process_batch, format_summary
+from .results import ResultCache
+from .jobs import JOB_STATES, Job, JobCancelled, JobManager
+from .merge import align_stations, joint_segment_bounds, process_stations
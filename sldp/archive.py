@@ -0,0 +1,155 @@
+"""Binary station archive: fixed-width records plus a sparse time index.
+
+Layout (little endian)::
+
+    header   64 bytes: magic, version, index stride, record count,
+             index offset, index entry count
+    records  record count x RECORD_DTYPE (epoch ns, level, flag), sorted by time
+    index    epoch of every ``stride``-th record, int64
+
+Records are read through ``np.memmap``, so a time-range query only touches
+the pages it needs.
+"""
+import os
+import struct
+
+import numpy as np
+
+from .series import SeaLevelSeries
+
+ARCHIVE_MAGIC = b'SLDPARC1'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.sldpa'
+HEADER = struct.Struct('<8sIIQQQ')
+HEADER_SIZE = 64
+RECORD_DTYPE = np.dtype([('epoch', '<i8'), ('level', '<f8'), ('flag', 'u1')])
+INDEX_STRIDE = 4096
+
+
+def is_archive(path):
+    try:
+        with open(path, 'rb') as handle:
+            return handle.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+    except OSError:
+        return False
+
+
+class ArchiveWriter:
+    """Appends sorted ``SeaLevelSeries`` chunks to a new archive file.
+
+    The header is only written by ``close``; used as a context manager, a
+    write that fails leaves no archive behind (see ``abort``).
+    """
+
+    def __init__(self, path, stride=INDEX_STRIDE):
+        self.path = path
+        self.stride = stride
+        self.count = 0
+        self.index = []
+        self.last_epoch = None
+        self._handle = open(path, 'wb')
+        self._handle.write(b'\0' * HEADER_SIZE)
+
+    def write(self, series):
+        if len(series) == 0:
+            return
+        epoch = series.epoch
+        if (np.diff(epoch) < 0).any() or (self.last_epoch is not None and epoch[0] < self.last_epoch):
+            raise ValueError("Archive records must be sorted by time")
+        records = np.empty(len(series), dtype=RECORD_DTYPE)
+        records['epoch'] = epoch
+        records['level'] = series.level
+        records['flag'] = series.flag
+        self._handle.write(records.tobytes())
+        # Index positions are global record numbers that are multiples of the stride
+        first = -self.count % self.stride
+        self.index.append(epoch[first::self.stride])
+        self.count += len(series)
+        self.last_epoch = epoch[-1]
+
+    def close(self):
+        index = np.concatenate(self.index) if self.index else np.empty(0, dtype=np.int64)
+        index_offset = HEADER_SIZE + self.count * RECORD_DTYPE.itemsize
+        self._handle.write(index.astype('<i8').tobytes())
+        self._handle.seek(0)
+        self._handle.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, self.stride, self.count, index_offset,
+                                       len(index)))
+        self._handle.close()
+
+    def abort(self):
+        # Drops the partial file, which has no valid header yet
+        self._handle.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_archive(series, path, stride=INDEX_STRIDE):
+    with ArchiveWriter(path, stride) as writer:
+        writer.write(series)
+    return path
+
+
+def build_archive(input_file_path, archive_path, chunk_size=1000000, timestamp_format=None):
+    """Convert a tab-separated station file to an archive, ``chunk_size`` rows at a time."""
+    from .loader import raw_to_series, read_raw  # the loader reads archives, so import it late
+    with ArchiveWriter(archive_path) as writer:
+        for chunk in read_raw(input_file_path, chunksize=chunk_size):
+            series = raw_to_series(chunk, timestamp_format)
+            writer.write(series)
+    return archive_path
+
+
+class StationArchive:
+    """Read-only, memory-mapped view of an archive file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            magic, version, self.stride, self.count, index_offset, index_count = HEADER.unpack(
+                handle.read(HEADER.size))
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{path} is not a version {ARCHIVE_VERSION} station archive")
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(self.count,)) \
+            if self.count else np.empty(0, dtype=RECORD_DTYPE)
+        # The sparse index is small enough to keep in memory
+        self.index = np.fromfile(path, dtype='<i8', count=index_count, offset=index_offset)
+
+    def __len__(self):
+        return self.count
+
+    def record_offset(self, position):
+        return HEADER_SIZE + position * RECORD_DTYPE.itemsize
+
+    def locate(self, timestamp, side='left'):
+        """Record position of ``timestamp`` as ``np.searchsorted`` would give it."""
+        target = np.datetime64(timestamp, 'ns').astype(np.int64)
+        # The sparse index narrows the search to one block of the memory map
+        block = max(np.searchsorted(self.index, target, side=side) - 1, 0)
+        start = block * self.stride
+        stop = min(start + 2 * self.stride, self.count)
+        return start + int(np.searchsorted(self.records['epoch'][start:stop], target, side=side))
+
+    def series(self, start=None, end=None):
+        """Samples with ``start <= time < end``; either bound may be None."""
+        first = self.locate(start) if start is not None else 0
+        last = self.locate(end) if end is not None else self.count
+        return self.slice(first, last)
+
+    def slice(self, first, last):
+        records = self.records[first:last]
+        return SeaLevelSeries(np.array(records['epoch']), np.array(records['level']), np.array(records['flag']))
+
+    def chunks(self, chunk_size, first=0):
+        for start in range(first, self.count, chunk_size):
+            yield self.slice(start, min(start + chunk_size, self.count))
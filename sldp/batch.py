@@ -0,0 +1,85 @@
+import glob
+import os
+import time
+
+from .pipeline import process_file
+from .progress import ProgressReporter, logging_reporter
+
+INPUT_PATTERN = '*.txt'
+
+
+def is_batch_input(path):
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def collect_inputs(path):
+    # A directory means every .txt file in it; anything else is used as a glob
+    if os.path.isdir(path):
+        path = os.path.join(path, INPUT_PATTERN)
+    return sorted(p for p in glob.glob(path) if os.path.isfile(p))
+
+
+def output_folders(inputs, output_folder):
+    # One subfolder per input file, named after it; repeated names get a suffix
+    folders = []
+    seen = {}
+    for input_path in inputs:
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}_{seen[name]}"
+        folders.append(os.path.join(output_folder, name))
+    return folders
+
+
+def _process_one(input_path, output_folder, options):
+    started = time.perf_counter()
+    try:
+        summary = process_file(input_path, output_folder, ProgressReporter(), **options)
+        summary['error'] = None
+    except Exception as e:
+        summary = {'input': input_path, 'rows': 0, 'interpolated': 0, 'segments': 0, 'files': [],
+                   'elapsed': time.perf_counter() - started, 'error': str(e)}
+    return summary
+
+
+def process_batch(inputs, output_folder, workers=None, reporter=None, **options):
+    """Process many station files over a process pool.
+
+    ``inputs`` is a directory, a glob pattern or a list of paths. Each file is
+    written to its own subfolder of ``output_folder``; ``options`` are passed
+    to ``process_file``. Returns the per-file summaries in input order, with
+    an 'error' entry set for files that failed.
+    """
+    reporter = reporter or logging_reporter()
+    if isinstance(inputs, str):
+        inputs = collect_inputs(inputs)
+    if not inputs:
+        reporter.message("No input files found.", "warning")
+        return []
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    folders = output_folders(inputs, output_folder)
+    summaries = [None] * len(inputs)
+    reporter.message(f"Processing {len(inputs)} files...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_process_one, path, folder, options): i
+                   for i, (path, folder) in enumerate(zip(inputs, folders))}
+        for done, future in enumerate(as_completed(futures), 1):
+            summary = summaries[futures[future]] = future.result()
+            if summary['error']:
+                reporter.message(f"Failed {summary['input']}: {summary['error']}", "error")
+            else:
+                reporter.message(f"Processed {summary['input']} into {summary['segments']} segments", "success")
+            reporter.progress(done / len(inputs), f"Processed {done}/{len(inputs)} files")
+    return summaries
+
+
+def format_summary(summaries):
+    header = f"{'file':<40} {'rows':>10} {'gaps':>8} {'segments':>9} {'seconds':>9}  status"
+    lines = [header, '-' * len(header)]
+    for summary in summaries:
+        status = f"error: {summary['error']}" if summary['error'] else 'ok'
+        lines.append(f"{os.path.basename(summary['input']):<40} {summary['rows']:>10} "
+                     f"{summary['interpolated']:>8} {summary['segments']:>9} {summary['elapsed']:>9.2f}  {status}")
+    return '\n'.join(lines)
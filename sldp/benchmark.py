@@ -0,0 +1,205 @@
+"""Synthetic sea level generator and per-stage pipeline benchmark.
+
+Run ``python -m sldp.benchmark --rows 10000 1000000`` to time every stage of
+the pipeline on generated tide series and print (or save) JSON results. The
+import time of the package is measured too and the run fails when it exceeds
+``--import-target``.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from . import __version__
+from .export import OUTPUT_FORMATS
+from .interpolation import INTERPOLATORS
+from .pipeline import process_file
+from .progress import ProgressReporter
+
+# Main tidal constituents: (period in hours, amplitude in metres)
+TIDAL_CONSTITUENTS = (
+    (12.4206, 0.60),  # M2
+    (12.0000, 0.20),  # S2
+    (23.9345, 0.15),  # K1
+    (25.8193, 0.10),  # O1
+)
+MEAN_SEA_LEVEL = 2.0
+NOISE_STD = 0.01
+BREAK_SAMPLES = 60
+GENERATE_CHUNK_ROWS = 1000000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Cold ``import sldp`` in a fresh interpreter, numpy and pandas included
+IMPORT_TIME_TARGET = 1.5
+IMPORT_REPEATS = 3
+# Loaded on first use only; importing the package must not pull them in
+LAZY_MODULES = ('tkinter', 'customtkinter', 'PIL', 'openpyxl', 'sqlite3', 'cProfile', 'pstats')
+
+
+def tide_levels(seconds, rng, noise_std=NOISE_STD):
+    hours = seconds / 3600.0
+    levels = np.full(len(hours), MEAN_SEA_LEVEL)
+    for period, amplitude in TIDAL_CONSTITUENTS:
+        levels += amplitude * np.cos(2 * np.pi * hours / period)
+    return levels + rng.normal(0, noise_std, len(hours))
+
+
+def synthetic_series(rows, interval='1min', gap_rate=0.01, segments=10, seed=0, start='2020-01-01'):
+    """Return a tide series of about ``rows`` samples as a timestamp/sea_level frame.
+
+    Single samples are dropped at ``gap_rate`` (fillable gaps) and
+    ``segments - 1`` breaks of ``BREAK_SAMPLES`` samples split the series.
+    """
+    return pd.concat(list(_synthetic_chunks(rows, interval, gap_rate, segments, seed, start)), ignore_index=True)
+
+
+def _synthetic_chunks(rows, interval, gap_rate, segments, seed, start):
+    rng = np.random.default_rng(seed)
+    step = pd.Timedelta(interval).value
+    origin = pd.Timestamp(start).value
+    breaks = np.sort(rng.choice(np.arange(1, max(2, rows)), size=min(max(segments - 1, 0), max(rows - 1, 0)),
+                            replace=False))
+    previous_dropped = True  # the first sample is always kept
+    for first in range(0, rows, GENERATE_CHUNK_ROWS):
+        index = np.arange(first, min(first + GENERATE_CHUNK_ROWS, rows), dtype=np.int64)
+        # Each break shifts the following samples further along the time axis
+        sample = index + BREAK_SAMPLES * np.searchsorted(breaks, index, side='right')
+        # Dropped samples are kept apart so every gap is a single, fillable sample
+        drop = rng.random(len(index)) < gap_rate
+        drop[1:] &= ~drop[:-1]
+        drop[0] &= not previous_dropped
+        previous_dropped = bool(drop[-1])
+        sample = sample[~drop]
+        epoch_ns = origin + sample * step
+        yield pd.DataFrame({
+            'timestamp': epoch_ns.view('datetime64[ns]'),
+            'sea_level': np.round(tide_levels((epoch_ns - origin) / 1e9, rng), 4),
+        })
+
+
+def write_synthetic_file(path, rows, interval='1min', gap_rate=0.01, segments=10, seed=0, start='2020-01-01'):
+    # Written chunk by chunk so 50M-row files do not need to fit in memory
+    with open(path, 'w', newline='') as handle:
+        for chunk in _synthetic_chunks(rows, interval, gap_rate, segments, seed, start):
+            chunk.to_csv(handle, sep='\t', header=False, index=False, date_format=TIMESTAMP_FORMAT)
+    return path
+
+
+def run_benchmark(rows, output_format='csv', interval='1min', gap_rate=0.01, segments=10, max_fill=1,
+                  seed=0, workdir=None, interpolator='monte_carlo'):
+    """Time each pipeline stage on a synthetic file of ``rows`` samples.
+
+    The file goes through ``process_file`` with profiling on. Returns its
+    per-stage timings (see ``StageTimer``) plus the run parameters. The
+    peak RSS of a stage is the peak of the whole process so far; ``main``
+    runs every size in a new process. Files are written under ``workdir``,
+    or a temporary folder removed afterwards.
+    """
+    if workdir is None:
+        temporary = workdir = tempfile.mkdtemp(prefix='sldp-bench-')
+    else:
+        temporary = None
+    try:
+        input_path = os.path.join(workdir, f"synthetic_{rows}.txt")
+        write_synthetic_file(input_path, rows, interval, gap_rate, segments, seed)
+        summary = process_file(input_path, os.path.join(workdir, f"output_{rows}"), ProgressReporter(),
+                               max_fill=max_fill, seed=seed, output_format=output_format,
+                               interpolator=interpolator, profile=True)
+    finally:
+        if temporary is not None:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    return {
+        'rows': summary['rows'],
+        'interpolated': summary['interpolated'],
+        'segments': summary['segments'],
+        'output_format': output_format,
+        'interpolator': interpolator,
+        'total_seconds': summary['timing']['wall_seconds'],
+        'stages': summary['timing']['stages'],
+    }
+
+
+def measure_import(module='sldp', repeats=IMPORT_REPEATS, target=IMPORT_TIME_TARGET):
+    """Time ``import module`` in fresh interpreters and list the lazy modules it loaded.
+
+    The fastest of ``repeats`` runs is compared with ``target`` seconds.
+    """
+    code = (f"import sys, time; started = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - started); print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+    runs, loaded = [], set()
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env=env).stdout.splitlines()
+        runs.append(float(output[0]))
+        loaded.update(filter(None, output[1].split(',')) if len(output) > 1 else ())
+    return {
+        'module': module,
+        'seconds': min(runs),
+        'runs': runs,
+        'target_seconds': target,
+        'lazy_modules_loaded': sorted(loaded),
+        'ok': min(runs) <= target and not loaded,
+    }
+
+
+def environment():
+    return {
+        'sldp': __version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m sldp.benchmark',
+                                     description="Benchmark the SLDP pipeline on synthetic tide series.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="series sizes to benchmark (default: %(default)s)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='csv',
+                        help="segment file format (default: %(default)s)")
+    parser.add_argument('--interval', default='1min', help="sampling interval (default: %(default)s)")
+    parser.add_argument('--gap-rate', type=float, default=0.01,
+                        help="fraction of single samples dropped (default: %(default)s)")
+    parser.add_argument('--segments', type=int, default=10, help="number of segments (default: %(default)s)")
+    parser.add_argument('--max-fill', type=int, default=1, help="gap fill length (default: %(default)s)")
+    parser.add_argument('--interpolator', choices=tuple(INTERPOLATORS), default='monte_carlo',
+                        help="gap fill method (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed (default: %(default)s)")
+    parser.add_argument('--import-target', type=float, default=IMPORT_TIME_TARGET, metavar='SECONDS',
+                        help="fail when importing sldp takes longer than this (default: %(default)s)")
+    parser.add_argument('-o', '--output', default=None, help="write the JSON results to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = {'environment': environment(), 'import': measure_import(target=args.import_target), 'runs': []}
+    # Peak RSS is a lifetime peak per process, so each size runs in a fresh interpreter
+    with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        for rows in args.rows:
+            results['runs'].append(pool.apply(run_benchmark, (rows, args.format, args.interval, args.gap_rate,
+                                                              args.segments, args.max_fill, args.seed),
+                                              {'interpolator': args.interpolator}))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+    return 0 if results['import']['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .series import INTERPOLATED
+
+CATALOG_FORMATS = ('csv', 'parquet', 'sqlite')
+CATALOG_NAME = 'catalog'
+CATALOG_TABLE = 'segments'
+CATALOG_COLUMNS = ['segment_id', 'file', 'start', 'end', 'rows', 'interpolated', 'min', 'max', 'mean', 'std']
+STATS_COLUMNS = ['start', 'end', 'rows', 'interpolated', 'min', 'max', 'mean', 'm2']
+
+
+def piece_stats(series, starts, stops):
+    """Per-piece statistics of ``series`` for the contiguous pieces ``[starts[k], stops[k])``.
+
+    Computed with ``reduceat`` in one pass over the levels (two for the
+    spread). Returns a frame with start/end time, row and interpolated
+    counts, min/max/mean and ``m2``, the sum of squared deviations, which
+    ``merge_stats`` needs to combine pieces of the same segment.
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    stops = np.asarray(stops, dtype=np.intp)
+    keep = stops > starts
+    starts, stops = starts[keep], stops[keep]
+    if len(starts) == 0:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+
+    first = starts[0]
+    offsets = starts - first
+    rows = stops - starts
+    level = series.level[first:stops[-1]].astype(np.float64)
+    mean = np.add.reduceat(level, offsets) / rows
+    deviation = level - np.repeat(mean, rows)
+    return pd.DataFrame({
+        'start': series.times[starts],
+        'end': series.times[stops - 1],
+        'rows': rows,
+        'interpolated': np.add.reduceat((series.flag[first:stops[-1]] == INTERPOLATED).astype(np.int64), offsets),
+        'min': np.minimum.reduceat(level, offsets),
+        'max': np.maximum.reduceat(level, offsets),
+        'mean': mean,
+        'm2': np.add.reduceat(deviation * deviation, offsets),
+    })
+
+
+def merge_stats(first, second):
+    # Combines two consecutive pieces of one segment (Chan et al. parallel variance)
+    rows = first['rows'] + second['rows']
+    delta = second['mean'] - first['mean']
+    return {
+        'start': first['start'],
+        'end': second['end'],
+        'rows': rows,
+        'interpolated': first['interpolated'] + second['interpolated'],
+        'min': min(first['min'], second['min']),
+        'max': max(first['max'], second['max']),
+        'mean': first['mean'] + delta * second['rows'] / rows,
+        'm2': first['m2'] + second['m2'] + delta * delta * first['rows'] * second['rows'] / rows,
+    }
+
+
+def stats_to_catalog(stats, files):
+    # The columns are given so no stats at all (an empty stream) still make an empty catalog
+    catalog = pd.DataFrame(stats, columns=STATS_COLUMNS).reset_index(drop=True)
+    catalog.insert(0, 'segment_id', np.arange(1, len(catalog) + 1))
+    catalog.insert(1, 'file', [os.path.basename(path) for path in files])
+    # Sample standard deviation, as pandas computes it; undefined for one-row segments
+    with np.errstate(invalid='ignore', divide='ignore'):
+        catalog['std'] = np.sqrt(catalog['m2'].astype(float) / (catalog['rows'] - 1))
+    catalog.loc[catalog['rows'] < 2, 'std'] = np.nan
+    return catalog[CATALOG_COLUMNS]
+
+
+def catalog_to_stats(catalog):
+    # Inverse of stats_to_catalog, used to extend a catalog on an incremental run
+    stats = catalog.drop(columns=['segment_id', 'file', 'std'])
+    stats['m2'] = catalog['std'].fillna(0) ** 2 * (catalog['rows'] - 1)
+    return stats.to_dict('records')
+
+
+def segment_catalog(series, bounds, files):
+    """Catalog of every segment of ``series``: one row per ``bounds`` entry."""
+    return stats_to_catalog(piece_stats(series, *bounds), files)
+
+
+def catalog_path(output_folder, catalog_format):
+    extension = 'sqlite' if catalog_format == 'sqlite' else catalog_format
+    return os.path.join(output_folder, f"{CATALOG_NAME}.{extension}")
+
+
+def check_catalog_format(catalog_format):
+    if catalog_format is not None and catalog_format not in CATALOG_FORMATS:
+        raise ValueError(f"Unknown catalog format '{catalog_format}', expected one of {', '.join(CATALOG_FORMATS)}")
+
+
+def write_catalog(catalog, output_folder, catalog_format='csv'):
+    check_catalog_format(catalog_format)
+    path = catalog_path(output_folder, catalog_format)
+    if catalog_format == 'csv':
+        catalog.to_csv(path, index=False)
+    elif catalog_format == 'parquet':
+        catalog.to_parquet(path, index=False)
+    else:
+        import sqlite3
+        with sqlite3.connect(path) as connection:
+            catalog.to_sql(CATALOG_TABLE, connection, if_exists='replace', index=False)
+        connection.close()
+    return path
+
+
+def read_catalog(output_folder, catalog_format='csv'):
+    check_catalog_format(catalog_format)
+    path = catalog_path(output_folder, catalog_format)
+    if catalog_format == 'csv':
+        return pd.read_csv(path, parse_dates=['start', 'end'])
+    if catalog_format == 'parquet':
+        return pd.read_parquet(path)
+    import sqlite3
+    with sqlite3.connect(path) as connection:
+        catalog = pd.read_sql(f"SELECT * FROM {CATALOG_TABLE}", connection, parse_dates=['start', 'end'])
+    connection.close()
+    return catalog
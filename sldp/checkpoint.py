@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .io_utils import atomic_write
+from .series import SeaLevelSeries
+
+CHECKPOINT_DIR = '.sldp-checkpoint'
+CHECKPOINT_FILE = 'checkpoint.json'
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_key(input_file_path, options):
+    # The input's size and mtime and every option that changes a stage result
+    stat = os.stat(input_file_path)
+    text = json.dumps({'version': CHECKPOINT_VERSION, 'input': os.path.abspath(input_file_path),
+                       'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'options': options},
+                      sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class StageCheckpoint:
+    """Results of the finished stages of a run, kept in ``<output>/.sldp-checkpoint``.
+
+    A stage is saved with ``save(stage, series, **meta)``: the series goes to
+    ``<stage>.npz`` and ``meta`` (JSON-ready values) to the checkpoint file,
+    which is rewritten after every stage. Checkpoints saved under another
+    ``key`` (a different input or options, see ``checkpoint_key``) are
+    discarded when the checkpoint is opened.
+    """
+
+    def __init__(self, output_folder, key):
+        self.folder = os.path.join(output_folder, CHECKPOINT_DIR)
+        self.key = key
+        self.stages = {}
+        try:
+            with open(os.path.join(self.folder, CHECKPOINT_FILE)) as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            state = None
+        if state is not None and state.get('key') == key:
+            self.stages = state['stages']
+        else:
+            self.clear()
+
+    def __contains__(self, stage):
+        return stage in self.stages
+
+    @property
+    def last(self):
+        # Name of the stage saved last, or None
+        return next(reversed(self.stages), None)
+
+    def meta(self, stage):
+        return self.stages[stage]
+
+    def series(self, stage):
+        with np.load(os.path.join(self.folder, f"{stage}.npz")) as saved:
+            std = saved['std'] if 'std' in saved else None
+            return SeaLevelSeries(saved['epoch_ns'], saved['sea_level'], saved['flag'], std)
+
+    def save(self, stage, series=None, **meta):
+        os.makedirs(self.folder, exist_ok=True)
+        if series is not None:
+            arrays = {'epoch_ns': series.epoch, 'sea_level': series.level, 'flag': series.flag}
+            if series.std is not None:
+                arrays['std'] = series.std
+            with atomic_write(os.path.join(self.folder, f"{stage}.npz"), 'wb') as handle:
+                np.savez(handle, **arrays)
+        self.stages[stage] = meta
+        with atomic_write(os.path.join(self.folder, CHECKPOINT_FILE)) as handle:
+            json.dump({'version': CHECKPOINT_VERSION, 'key': self.key, 'stages': self.stages}, handle, indent=2)
+
+    def clear(self):
+        self.stages = {}
+        shutil.rmtree(self.folder, ignore_errors=True)
@@ -0,0 +1,162 @@
+import argparse
+import logging
+import sys
+
+from .archive import build_archive
+from .batch import format_summary, is_batch_input, process_batch
+from .catalog import CATALOG_FORMATS
+from .export import OUTPUT_FORMATS
+from .interpolation import INTERPOLATORS
+from .merge import process_stations
+from .pipeline import process_file
+from .products import PRODUCTS
+from .profiling import PROFILE_TOOLS
+from .qc import QC_ACTIONS, SPIKE_THRESHOLD
+from .results import RESULT_CACHE_ENV, RESULT_CACHE_LIMIT, ResultCache
+from .stream import DEFAULT_CHUNK_SIZE
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='sldp',
+        description="Fill gaps of up to --max-fill samples at the inferred (or --interval) sampling interval in a "
+                    "sea level station file and export its continuous segments.",
+    )
+    parser.add_argument('input', help="tab-separated input file (Date | Sea Level, no header), "
+                                      "or a directory / glob of such files for batch mode")
+    parser.add_argument('output', help="directory for the exported segments")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes in batch mode (default: number of CPUs)")
+    parser.add_argument('--merge', action='store_true',
+                        help="align the station files of a batch input on one time grid and export the "
+                             "segments where the stations are continuous together")
+    parser.add_argument('--require', action='append', default=None, metavar='STATION',
+                        help="with --merge, only these stations (input file names without extension) must be "
+                             "continuous; repeatable (default: all)")
+    parser.add_argument('--grid', default='1min', help="with --merge, the shared time grid (default: %(default)s)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='xlsx',
+                        help="segment file format (default: %(default)s)")
+    parser.add_argument('--single-file', action='store_true',
+                        help="write all segments to one file with a segment_id column (not for xlsx)")
+    # Left unset by default so --merge can tell an explicit --catalog from the default
+    parser.add_argument('--catalog', choices=CATALOG_FORMATS + ('none',), default=None,
+                        help="format of the segment catalog with per-segment statistics (default: csv)")
+    parser.add_argument('-w', '--writers', type=int, default=1,
+                        help="segments written concurrently (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=None, metavar='ROWS',
+                        help="stream the input in chunks of this many rows to bound memory use")
+    parser.add_argument('--to-archive', action='store_true',
+                        help="convert the input to a binary station archive at OUTPUT instead of processing it")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only process data added since the last run into the output directory")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="keep finished stages in the output directory so a failed run resumes after them")
+    parser.add_argument('--preview', action='store_true',
+                        help="also write a min/max decimated copy of the series for fast plotting")
+    parser.add_argument('--product', action='append', choices=PRODUCTS, default=[], metavar='NAME',
+                        help="also write a derived product next to the segments: hourly or daily means, or tidal "
+                             "extrema (repeatable)")
+    parser.add_argument('--result-cache', action='store_true',
+                        help="reuse the outputs of an earlier run of the same input with the same options")
+    parser.add_argument('--result-cache-dir', default=None, metavar='DIR',
+                        help=f"result cache folder, implies --result-cache (default: ${RESULT_CACHE_ENV} or "
+                             f"~/.cache/sldp/results)")
+    parser.add_argument('--result-cache-limit', type=int, default=RESULT_CACHE_LIMIT >> 20, metavar='MB',
+                        help="evict the least recently used results beyond this size (default: %(default)s)")
+    parser.add_argument('--timestamp-format', default=None, metavar='FORMAT',
+                        help="strftime format of the Date column (default: detected from a sample of the rows)")
+    parser.add_argument('--cache', action='store_true',
+                        help="keep parsed input next to the input file and reuse it on later runs")
+    parser.add_argument('--interval', default=None,
+                        help="nominal sampling interval such as 1min, 30s or 15s (default: inferred)")
+    parser.add_argument('--max-fill', type=int, default=1, metavar='SAMPLES',
+                        help="fill gaps of up to this many missing samples (default: %(default)s)")
+    parser.add_argument('--no-qc', action='store_true',
+                        help="skip the quality checks (duplicates, out-of-order rows, spikes, flatlines)")
+    for name, default in (('duplicates', 'drop'), ('spikes', 'flag'), ('flatlines', 'flag')):
+        parser.add_argument(f'--{name}', choices=QC_ACTIONS, default=default,
+                            help=f"flag or drop {name} found by the quality checks (default: %(default)s)")
+    parser.add_argument('--spike-threshold', type=float, default=SPIKE_THRESHOLD, metavar='MADS',
+                        help="spike threshold in robust standard deviations (default: %(default)s)")
+    parser.add_argument('--interpolator', choices=tuple(INTERPOLATORS), default='monte_carlo',
+                        help="gap fill method (default: %(default)s)")
+    parser.add_argument('--uncertainty', action='store_true',
+                        help="add an interpolation_std column with the standard deviation of every filled point")
+    parser.add_argument('--simulations', type=int, default=1000,
+                        help="Monte Carlo draws per missing point (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for reproducible runs")
+    parser.add_argument('--expected', action='store_true',
+                        help="use the closed-form expected value instead of sampling")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every stage and write sldp-timing.json to the output directory")
+    parser.add_argument('--profile-with', action='append', choices=PROFILE_TOOLS, default=[], metavar='TOOL',
+                        help=f"also capture {' or '.join(PROFILE_TOOLS)} while profiling (repeatable)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only report warnings and errors")
+    parser.add_argument('-v', '--verbose', action='store_true', help="also report progress updates")
+    return parser
+
+
+def configure_logging(args):
+    level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(message)s')
+
+
+def check_merge_options(parser, args):
+    # Merged runs have no per-station pipeline options beyond the gap fill and the output format
+    unsupported = [flag for flag, used in (
+        ('--chunk-size', args.chunk_size), ('--incremental', args.incremental), ('--checkpoint', args.checkpoint),
+        ('--catalog', args.catalog is not None), ('--uncertainty', args.uncertainty),
+        ('--profile', args.profile or args.profile_with), ('--product', args.product), ('--preview', args.preview),
+        ('--result-cache', args.result_cache or args.result_cache_dir)) if used]
+    if unsupported:
+        parser.error(f"--merge cannot be combined with {', '.join(unsupported)}")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.merge:
+        check_merge_options(parser, args)
+    configure_logging(args)
+    options = {
+        'interval': args.interval, 'max_fill': args.max_fill, 'num_simulations': args.simulations,
+        'seed': args.seed, 'expected': args.expected, 'output_format': args.format,
+        'single_file': args.single_file, 'chunk_size': args.chunk_size,
+        'timestamp_format': args.timestamp_format, 'cache': args.cache, 'incremental': args.incremental,
+        'writers': args.writers, 'catalog': None if args.catalog == 'none' else args.catalog or 'csv',
+        'profile': tuple(args.profile_with) or args.profile, 'checkpoint': args.checkpoint,
+        'preview': args.preview, 'products': tuple(args.product),
+        'result_cache': (ResultCache(args.result_cache_dir, args.result_cache_limit << 20)
+                         if args.result_cache or args.result_cache_dir else False),
+        'interpolator': args.interpolator, 'uncertainty': args.uncertainty,
+        'qc': False if args.no_qc else {'duplicates': args.duplicates, 'spikes': args.spikes,
+                                        'flatlines': args.flatlines, 'spike_threshold': args.spike_threshold},
+    }
+    if args.to_archive:
+        build_archive(args.input, args.output, args.chunk_size or DEFAULT_CHUNK_SIZE, args.timestamp_format)
+        logging.getLogger('sldp').info(f"Wrote station archive {args.output}")
+        return 0
+    if args.merge:
+        merge_options = {key: options[key] for key in ('interval', 'max_fill', 'num_simulations', 'seed', 'expected',
+                                                        'output_format', 'single_file', 'timestamp_format',
+                                                        'cache', 'writers', 'interpolator', 'qc')}
+        try:
+            process_stations(args.input, args.output, require=args.require, grid=args.grid, **merge_options)
+        except Exception as e:
+            logging.getLogger('sldp').error(f"Error during merging: {e}")
+            return 1
+        return 0
+    if is_batch_input(args.input):
+        summaries = process_batch(args.input, args.output, workers=args.workers, **options)
+        print(format_summary(summaries))
+        return 1 if any(summary['error'] for summary in summaries) else 0
+    try:
+        process_file(args.input, args.output, **options)
+    except Exception as e:
+        logging.getLogger('sldp').error(f"Error during processing: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
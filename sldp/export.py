@@ -0,0 +1,238 @@
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .progress import logging_reporter
+from .segments import iter_segments
+from .series import as_frame
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet', 'feather')
+EXCEL_MAX_ROWS = 1048576
+# openpyxl is pure Python and holds the GIL, so xlsx segments are written in worker processes;
+# the pandas/pyarrow csv, parquet and feather writers are I/O-bound and use threads
+PROCESS_WRITER_FORMATS = ('xlsx',)
+
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("The parquet and feather output formats require the 'pyarrow' package") from None
+    return pyarrow
+
+
+def _to_arrow(frame):
+    return _arrow().Table.from_pandas(frame, preserve_index=False)
+
+
+def write_xlsx(segment, path):
+    # One row is taken by the header
+    if len(segment) >= EXCEL_MAX_ROWS:
+        raise ValueError(f"Segment with {len(segment)} data points does not fit in an Excel sheet; "
+                         "use the csv, parquet or feather output format instead")
+    segment.to_excel(path, index=False)
+
+
+def write_csv(segment, path):
+    segment.to_csv(path, index=False)
+
+
+def write_parquet(segment, path):
+    _arrow()
+    import pyarrow.parquet as pq
+    pq.write_table(_to_arrow(segment), path)
+
+
+def write_feather(segment, path):
+    _arrow()
+    import pyarrow.feather as feather
+    feather.write_feather(_to_arrow(segment), path)
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'feather': write_feather,
+}
+
+
+def check_format(output_format, single_file=False):
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    if single_file and output_format == 'xlsx':
+        raise ValueError("Single-file output is not available for xlsx; use csv, parquet or feather")
+
+
+class SegmentWriter:
+    """Appends frames to one output file, so a segment can be written in pieces."""
+
+    def __init__(self, path, output_format):
+        check_format(output_format)
+        self.path = path
+        self.output_format = output_format
+        self.rows = 0
+        self._writer = None
+        self._sheet = None
+        self._schema = None
+        self._reopened = False
+
+    @classmethod
+    def reopen(cls, path, output_format, rows):
+        """Writer that extends the existing ``rows``-row segment file at ``path``.
+
+        csv files are appended to in place. The other formats cannot be
+        extended, so on the first write the existing segment is read back and
+        rewritten ahead of the new rows; a writer that receives nothing leaves
+        the file untouched.
+        """
+        writer = cls(path, output_format)
+        writer.rows = rows
+        writer._reopened = output_format != 'csv'
+        return writer
+
+    def write(self, frame):
+        if len(frame) == 0:
+            return
+        frame = as_frame(frame)
+        if self._reopened:
+            self._reopened = False
+            existing = read_segment(self.path, self.output_format)
+            self.rows = 0
+            self.write(existing)
+        getattr(self, f"_write_{self.output_format}")(frame)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            if self.output_format == 'xlsx':
+                self._writer.save(self.path)
+            else:
+                self._writer.close()
+            self._writer = None
+
+    def _write_csv(self, frame):
+        frame.to_csv(self.path, index=False, mode='a' if self.rows else 'w', header=not self.rows)
+
+    def _table(self, frame):
+        # Later pieces are cast to the schema of the first one, e.g. a segment read back from disk
+        table = _to_arrow(frame)
+        if self._schema is None:
+            self._schema = table.schema
+        return table.cast(self._schema)
+
+    def _write_parquet(self, frame):
+        table = self._table(frame)
+        if self._writer is None:
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def _write_feather(self, frame):
+        # Feather V2 is the Arrow IPC file format
+        table = self._table(frame)
+        if self._writer is None:
+            self._writer = _arrow().ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def _write_xlsx(self, frame):
+        if self.rows + len(frame) >= EXCEL_MAX_ROWS:
+            raise ValueError(f"Segment with more than {EXCEL_MAX_ROWS - 1} data points does not fit in an "
+                             "Excel sheet; use the csv, parquet or feather output format instead")
+        if self._writer is None:
+            from openpyxl import Workbook
+            self._writer = Workbook(write_only=True)
+            self._sheet = self._writer.create_sheet()
+            self._sheet.append(list(frame.columns))
+        for row in frame.itertuples(index=False, name=None):
+            self._sheet.append(row)
+
+
+def read_segment(path, output_format):
+    readers = {
+        'xlsx': pd.read_excel,
+        'csv': lambda path: pd.read_csv(path, parse_dates=['timestamp']),
+        'parquet': pd.read_parquet,
+        'feather': pd.read_feather,
+    }
+    return readers[output_format](path)
+
+
+def segment_ids(bounds):
+    # 1-based segment number of every row, matching the segment_N file names
+    starts, stops = bounds
+    return np.repeat(np.arange(1, len(starts) + 1), stops - starts)
+
+
+def write_segment(segment, path, output_format):
+    # Segments stay array-backed until this point
+    WRITERS[output_format](as_frame(segment), path)
+    return len(segment)
+
+
+def export_segments(data, bounds, output_folder, reporter=None, output_format='xlsx', single_file=False,
+                    writers=1):
+    """Write every segment of ``data`` to ``output_folder`` and return the paths.
+
+    By default each segment goes to its own ``segment_N.<format>`` file. With
+    ``single_file=True`` all segments are written to one ``segments.<format>``
+    file with an extra 'segment_id' column (not available for xlsx).
+    ``writers`` > 1 writes that many segments concurrently, see
+    ``PROCESS_WRITER_FORMATS``; progress is still reported in segment order.
+    """
+    reporter = reporter or logging_reporter()
+    check_format(output_format, single_file)
+    if single_file:
+        return [_export_single(data, bounds, output_folder, reporter, output_format)]
+
+    num_segments = len(bounds[0])
+    output_files = []
+
+    def saved(i, output_file, size):
+        reporter.progress(0.75 + ((i + 1) / num_segments * 0.2), f"Saving segment {i + 1}/{num_segments}")
+        reporter.message(f"Saved segment {i + 1} with {size} data points to {output_file}", "success")
+        output_files.append(output_file)
+
+    if writers <= 1 or num_segments <= 1:
+        for i, segment in enumerate(iter_segments(data, bounds)):
+            output_file = os.path.join(output_folder, f"segment_{i + 1}.{output_format}")
+            saved(i, output_file, write_segment(segment, output_file, output_format))
+        return output_files
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    executor_class = ProcessPoolExecutor if output_format in PROCESS_WRITER_FORMATS else ThreadPoolExecutor
+    with executor_class(max_workers=writers) as executor:
+        # A bounded window of queued segments keeps memory flat and results in order
+        pending = deque()
+        for i, segment in enumerate(iter_segments(data, bounds)):
+            output_file = os.path.join(output_folder, f"segment_{i + 1}.{output_format}")
+            pending.append((i, output_file, executor.submit(write_segment, segment, output_file, output_format)))
+            if len(pending) >= 2 * writers:
+                i, output_file, future = pending.popleft()
+                saved(i, output_file, future.result())
+        while pending:
+            i, output_file, future = pending.popleft()
+            saved(i, output_file, future.result())
+    return output_files
+
+
+def _export_single(data, bounds, output_folder, reporter, output_format):
+    output_file = os.path.join(output_folder, f"segments.{output_format}")
+    data = as_frame(data).assign(segment_id=segment_ids(bounds))
+
+    if output_format == 'parquet':
+        # One row group per segment so readers can pick segments without a full scan
+        _arrow()
+        import pyarrow.parquet as pq
+        table = _to_arrow(data)
+        with pq.ParquetWriter(output_file, table.schema) as writer:
+            for start, stop in zip(*bounds):
+                writer.write_table(table.slice(start, stop - start))
+    else:
+        WRITERS[output_format](data, output_file)
+
+    reporter.progress(0.95, "Saving segments...")
+    reporter.message(f"Saved {len(bounds[0])} segments with {len(data)} data points to {output_file}", "success")
+    return output_file
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from .interpolation import make_interpolator
+from .series import INTERPOLATED, SeaLevelSeries
+
+ONE_MINUTE = np.timedelta64(1, 'm')
+
+
+def to_interval(interval):
+    # Accepts numpy/pandas/datetime timedeltas and strings such as '30s' or '1min'
+    return np.timedelta64(pd.Timedelta(interval).value, 'ns')
+
+
+def infer_interval(timestamps, default=ONE_MINUTE):
+    """Nominal sampling interval: the lower median of the positive timestamp steps.
+
+    The lower median is always one of the steps, where the plain median of
+    an even count may fall between two of them (90 s for 60 s and 120 s).
+    """
+    times = np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+    steps = np.diff(times)
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return to_interval(default)
+    middle = (len(steps) - 1) // 2
+    return np.timedelta64(int(np.partition(steps, middle)[middle]), 'ns')
+
+
+def max_step(interval, max_fill=1):
+    # Largest step still inside a segment once gaps of up to max_fill samples are filled
+    return (max_fill + 1) * to_interval(interval)
+
+
+def find_gaps(timestamps, interval=ONE_MINUTE, max_fill=1):
+    """Return ``(positions, missing)`` for every fillable gap.
+
+    A gap follows row ``positions[k]`` and lacks ``missing[k]`` whole samples,
+    between 1 and ``max_fill``.
+    """
+    times = np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+    interval = to_interval(interval).astype(np.int64)
+    steps = np.diff(times)
+    samples, remainder = np.divmod(steps, interval)
+    positions = np.flatnonzero((remainder == 0) & (samples >= 2) & (samples <= max_fill + 1))
+    return positions, samples[positions] - 1
+
+
+def fill_series(series, interval=ONE_MINUTE, max_fill=1, num_simulations=1000, seed=None, expected=False,
+                interpolator=None, uncertainty=False):
+    """Return ``series`` with 'Interpolated' samples in every gap of up to ``max_fill`` samples.
+
+    ``interval`` is the nominal sampling interval (see ``infer_interval``).
+    The result is sorted by time. ``interpolator`` is a name from
+    ``INTERPOLATORS`` or an ``Interpolator`` (Monte Carlo by default);
+    ``num_simulations``, ``seed`` and ``expected`` configure the Monte Carlo
+    method. With ``uncertainty=True`` the result carries the standard
+    deviation of every filled sample in ``std`` (NaN for methods without one).
+    """
+    interval = to_interval(interval)
+    interpolator = make_interpolator(interpolator or 'monte_carlo', num_simulations, seed, expected)
+    epoch, level, flag, std = series.epoch, series.level, series.flag, series.std
+
+    gaps, missing = find_gaps(series.times, interval, max_fill)
+    # One entry per missing sample: its gap and its 1-based step into that gap
+    owner = np.repeat(gaps, missing)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(missing) - missing, missing) + 1
+    target = epoch[owner] + step * interval.astype(np.int64)
+
+    interpolated, spread = interpolator.fill(series, owner, target)
+
+    epoch = np.insert(epoch, owner + 1, target)
+    level = np.insert(level, owner + 1, interpolated.astype(level.dtype))
+    flag = np.insert(flag, owner + 1, INTERPOLATED)
+    if uncertainty or std is not None:
+        std = np.zeros(len(series)) if std is None else std
+        std = np.insert(std, owner + 1, np.nan if spread is None or not uncertainty else spread)
+
+    # Unsorted input is still accepted, as it was by the old concat + sort_values
+    if len(epoch) > 1 and (np.diff(epoch) < 0).any():
+        order = np.argsort(epoch, kind='stable')
+        epoch, level, flag = epoch[order], level[order], flag[order]
+        std = None if std is None else std[order]
+
+    return SeaLevelSeries(epoch, level, flag, std)
+
+
+def fill_gaps(data, interval=ONE_MINUTE, max_fill=1, num_simulations=1000, seed=None, expected=False,
+              interpolator=None, uncertainty=False):
+    """DataFrame front end of ``fill_series``.
+
+    ``data`` needs 'timestamp' and 'sea_level' columns and may have a 'check'
+    column; the result has all three, with 'check' as a categorical, and
+    'interpolation_std' with ``uncertainty=True``.
+    """
+    filled = fill_series(SeaLevelSeries.from_frame(data), interval, max_fill, num_simulations, seed, expected,
+                         interpolator, uncertainty)
+    return filled.to_frame()
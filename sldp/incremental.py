@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from .catalog import catalog_to_stats, check_catalog_format, read_catalog, write_catalog
+from .export import check_format
+from .gaps import to_interval
+from .io_utils import atomic_write
+from .progress import logging_reporter
+from .qc import format_qc_summary, qc_options
+from .series import FLAG_LABELS, SeaLevelSeries
+from .stream import DEFAULT_CHUNK_SIZE, SegmentStream, stream_file
+
+STATE_FILE = 'sldp-state.json'
+STATE_VERSION = 1
+# Bytes before the resume offset that must be unchanged for the tail to be read directly
+TAIL_CHECK_BYTES = 4096
+
+
+def state_path(output_folder):
+    return os.path.join(output_folder, STATE_FILE)
+
+
+def read_state(output_folder):
+    try:
+        with open(state_path(output_folder)) as handle:
+            state = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def write_state(output_folder, state):
+    with atomic_write(state_path(output_folder)) as handle:
+        json.dump(state, handle, indent=2)
+
+
+def tail_digest(input_file_path, offset):
+    with open(input_file_path, 'rb') as handle:
+        handle.seek(max(0, offset - TAIL_CHECK_BYTES))
+        return hashlib.blake2b(handle.read(min(offset, TAIL_CHECK_BYTES)), digest_size=16).hexdigest()
+
+
+def remove_segments(output_folder, state):
+    for segment_id in range(1, state['segments'] + 1):
+        path = os.path.join(output_folder, f"segment_{segment_id}.{state['output_format']}")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _resume_offset(input_file_path, state):
+    # The tail can be read directly only if the input still starts with what was processed
+    offset = state['offset']
+    if os.path.getsize(input_file_path) < offset or tail_digest(input_file_path, offset) != state['tail_digest']:
+        return None
+    return offset
+
+
+def process_file_incremental(input_file_path, output_folder, reporter=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                             interval=None, max_fill=1, num_simulations=1000, seed=None, expected=False,
+                             output_format='xlsx', timestamp_format=None, catalog='csv', timer=None,
+                             interpolator='monte_carlo', uncertainty=False, qc=True):
+    """Process only the part of ``input_file_path`` added since the last run.
+
+    The state of each run (input offset, last row, open segment) is kept in
+    ``sldp-state.json`` in ``output_folder``. The next run reads the input from
+    that offset, extends the open segment and only creates new segments when
+    the data breaks. If the input was modified before the offset it is read
+    again from the start, still skipping rows that were already processed;
+    if the options changed, the output is rebuilt from scratch. The segment
+    ``catalog`` is extended from its previous version. Stages are timed on
+    ``timer`` when given.
+    """
+    reporter = reporter or logging_reporter()
+    check_format(output_format)
+    check_catalog_format(catalog)
+    started = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+
+    options = {'output_format': output_format, 'max_fill': max_fill, 'catalog': catalog,
+               'interpolator': getattr(interpolator, 'name', interpolator), 'uncertainty': uncertainty,
+               'qc': qc_options(qc)}
+    if interval is not None:
+        options['interval_ns'] = int(to_interval(interval).astype('int64'))
+    state = read_state(output_folder)
+    if state is not None and any(state.get(key) != value for key, value in options.items()):
+        reporter.message("Processing options changed since the last run; rebuilding all segments.", "warning")
+        remove_segments(output_folder, state)
+        state = None
+
+    reporter.message("Treatment started...")
+    if state is not None:
+        interval = state['interval_ns']
+        timestamp_format = timestamp_format or state['timestamp_format']
+    stream = SegmentStream(output_folder, reporter, interval, max_fill, num_simulations, seed, expected,
+                           output_format, timestamp_format=timestamp_format, timer=timer, interpolator=interpolator,
+                           uncertainty=uncertainty, qc=qc)
+
+    offset = 0
+    if state is not None:
+        carry = SeaLevelSeries.from_times([pd.Timestamp(state['last_timestamp']).as_unit('ns').to_datetime64()],
+                                          [state['last_value']], [FLAG_LABELS.index(state['last_check'])])
+        stream.resume(carry, state['segments'], state['open_segment_rows'])
+        if catalog and state['segments']:
+            stats = catalog_to_stats(read_catalog(output_folder, catalog))
+            stream.closed_stats, stream.open_stats = stats[:-1], stats[-1]
+        offset = _resume_offset(input_file_path, state)
+        if offset is None:
+            reporter.message("Input changed before the last processed position; re-reading it.", "warning")
+            offset = 0
+        reporter.message(f"Resuming after {state['last_timestamp']} in segment {state['segments']}.")
+
+    end = stream_file(stream, input_file_path, chunk_size, offset)
+    with stream.timer.stage('export'):
+        stream.close()
+    if catalog and stream.segments:
+        with stream.timer.stage('catalog'):
+            path = write_catalog(stream.catalog(), output_folder, catalog)
+        reporter.message(f"Wrote segment catalog to {path}", "success")
+    reporter.message(f"Found {stream.rows} new data points.", "success")
+
+    if stream.carry is not None:
+        last = stream.carry
+        write_state(output_folder, {
+            'version': STATE_VERSION,
+            'input': os.path.abspath(input_file_path),
+            'offset': end,
+            'tail_digest': tail_digest(input_file_path, end),
+            'last_timestamp': pd.Timestamp(last.times[0]).isoformat(),
+            'last_value': float(last.level[0]),
+            'last_check': FLAG_LABELS[last.flag[0]],
+            'segments': stream.segments,
+            'open_segment_rows': stream.writer.rows if stream.writer is not None else 0,
+            'interval_ns': int(stream.interval.astype('int64')),
+            'timestamp_format': stream.timestamp_format,
+            **options,
+        })
+
+    if stream.qc_summary is not None:
+        reporter.message(format_qc_summary(stream.qc_summary))
+    reporter.message(f"Interpolated {stream.interpolated} data points using {stream.interpolator.label}.",
+                     "success")
+    reporter.message(f"Output holds {stream.segments} segments.", "success")
+    reporter.message("Treatment completed successfully!", "complete")
+    reporter.progress(1.0, "Completed")
+    return stream.summary(input_file_path, started)
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+# Upper bound on normal draws held in memory at once (~32 MB of float64)
+MAX_DRAWS_PER_CHUNK = 1 << 22
+# Tidal constituents fitted by the harmonic interpolator: periods in hours (M2, S2, K1, O1)
+TIDAL_PERIODS = (12.4206, 12.0000, 23.9345, 25.8193)
+HARMONIC_WINDOW = pd.Timedelta('12h')
+# Upper bound on window samples (gaps x window rows x terms) in one batched least-squares fit
+MAX_FIT_VALUES = 1 << 23
+
+
+def monte_carlo_interpolation(left, right, num_simulations=1000, seed=None, expected=False,
+                              max_draws=MAX_DRAWS_PER_CHUNK, position=0.5, return_std=False):
+    """Monte Carlo estimate of the missing value between every ``left``/``right`` pair.
+
+    Each estimate is the mean of ``num_simulations`` normal draws centred on the
+    point at ``position`` (0 to 1, the midpoint by default) of the line from
+    ``left`` to ``right``, with a spread of 10% of the jump. ``seed`` may be an
+    int or a ``numpy.random.Generator``. With ``expected=True`` the
+    closed-form expectation is returned without drawing anything. With
+    ``return_std=True`` a second array holds the standard deviation of the
+    draws of every point (the closed-form spread when nothing is drawn).
+    Scalar ``left`` and ``right`` give floats instead of arrays.
+    """
+    left, right, position = np.broadcast_arrays(np.asarray(left, dtype=float), np.asarray(right, dtype=float),
+                                                np.asarray(position, dtype=float))
+    shape = left.shape
+    left, right, position = left.ravel(), right.ravel(), position.ravel()
+
+    base_value = left + (right - left) * position
+    std_dev = np.abs(right - left) * 0.1
+    if expected or num_simulations <= 0 or len(base_value) == 0:
+        result, spread = base_value, std_dev
+    else:
+        rng = np.random.default_rng(seed)
+        result = np.empty_like(base_value)
+        spread = np.empty_like(base_value)
+        rows_per_chunk = max(1, max_draws // num_simulations)
+        for start in range(0, len(base_value), rows_per_chunk):
+            stop = start + rows_per_chunk
+            draws = rng.standard_normal((len(base_value[start:stop]), num_simulations))
+            result[start:stop] = base_value[start:stop] + std_dev[start:stop] * draws.mean(axis=1)
+            if return_std:
+                spread[start:stop] = std_dev[start:stop] * draws.std(axis=1, ddof=1 if num_simulations > 1 else 0)
+    if shape == ():
+        # Scalar inputs give plain floats, as the original single-value function did
+        result, spread = result.item(), spread.item()
+    else:
+        result, spread = result.reshape(shape), spread.reshape(shape)
+    if return_std:
+        return result, spread
+    return result
+
+
+class Interpolator:
+    """Fills missing samples from the samples around them.
+
+    ``fill(series, owner, target)`` gets the ``SeaLevelSeries`` with the gaps,
+    the row before the gap of every missing sample (``owner``, ascending) and
+    the epoch of every missing sample in nanoseconds (``target``). It returns
+    the filled levels and their standard deviation, or None when the method
+    has no uncertainty estimate. Every gap is filled in one batched call.
+    """
+
+    name = None
+    label = None
+
+    def fill(self, series, owner, target):
+        raise NotImplementedError
+
+    @staticmethod
+    def position(series, owner, target):
+        # Fraction of the way from the row before the gap to the row after it
+        epoch = series.epoch
+        return (target - epoch[owner]) / (epoch[owner + 1] - epoch[owner])
+
+
+class MonteCarloInterpolator(Interpolator):
+    """``monte_carlo_interpolation`` on the line across each gap, with the spread of the draws."""
+
+    name = 'monte_carlo'
+    label = 'Monte Carlo simulation'
+
+    def __init__(self, num_simulations=1000, seed=None, expected=False):
+        self.num_simulations = num_simulations
+        # One generator for every call so repeated fills do not repeat the same draws
+        self.rng = np.random.default_rng(seed)
+        self.expected = expected
+
+    def fill(self, series, owner, target):
+        level = series.level
+        return monte_carlo_interpolation(level[owner], level[owner + 1], self.num_simulations, seed=self.rng,
+                                         expected=self.expected, position=self.position(series, owner, target),
+                                         return_std=True)
+
+
+class LinearInterpolator(Interpolator):
+    """Straight line between the samples on either side of each gap."""
+
+    name = 'linear'
+    label = 'linear interpolation'
+
+    def fill(self, series, owner, target):
+        left, right = series.level[owner].astype(float), series.level[owner + 1].astype(float)
+        return left + (right - left) * self.position(series, owner, target), None
+
+
+class CubicSplineInterpolator(Interpolator):
+    """Local cubic Hermite (Catmull-Rom) spline through the two samples on each side of a gap.
+
+    The slope at each gap end is the central difference over its neighbours,
+    one-sided at the ends of the series, so the fill joins the data smoothly.
+    """
+
+    name = 'cubic'
+    label = 'cubic spline'
+
+    def fill(self, series, owner, target):
+        epoch, level = series.epoch, series.level.astype(float)
+        last = len(epoch) - 1
+        before, after = np.maximum(owner - 1, 0), np.minimum(owner + 2, last)
+        t0, t1 = epoch[owner], epoch[owner + 1]
+        width = (t1 - t0).astype(float)
+        y0, y1 = level[owner], level[owner + 1]
+        # Slopes per gap width, from the neighbours of each end
+        m0 = (y1 - level[before]) / (t1 - epoch[before]) * width
+        m1 = (level[after] - y0) / (epoch[after] - t0) * width
+        s = (target - t0) / width
+        s2, s3 = s * s, s * s * s
+        values = ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * m0
+                  + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * m1)
+        return values, None
+
+
+class HarmonicInterpolator(Interpolator):
+    """Tidal harmonic fit by least squares on the samples within ``window`` of each gap.
+
+    The model is a mean, a linear trend and a cosine/sine pair for each of
+    ``periods`` (hours). The fits of all gaps are solved together as a batch
+    of normal equations; the standard deviation is the residual spread of the
+    fit. Gaps with too few samples around them fall back to a straight line.
+    """
+
+    name = 'harmonic'
+    label = 'tidal harmonic fit'
+
+    def __init__(self, window=HARMONIC_WINDOW, periods=TIDAL_PERIODS, max_values=MAX_FIT_VALUES):
+        self.window = pd.Timedelta(window).value
+        self.frequencies = 2 * np.pi / (np.asarray(periods, dtype=float) * 3600e9)
+        self.max_values = max_values
+
+    def tidal(self, offset):
+        # Cosine/sine pairs at ``offset`` ns from the start of the series
+        angle = offset[..., None] * self.frequencies
+        return np.concatenate((np.cos(angle), np.sin(angle)), axis=-1)
+
+    def design(self, offset, tidal):
+        # Mean and trend (in units of the window) from the gap, then the tidal terms
+        return np.concatenate((np.ones_like(offset)[..., None], (offset / self.window)[..., None], tidal), axis=-1)
+
+    def fill(self, series, owner, target):
+        if len(owner) == 0:
+            return np.empty(0), np.empty(0)
+        epoch, level = series.epoch, series.level.astype(float)
+        gaps, gap_of = np.unique(owner, return_inverse=True)
+        steps = np.diff(epoch)
+        steps = steps[steps > 0]
+        step = np.median(steps) if len(steps) else self.window
+        side = max(1, int(np.ceil(self.window / step)))
+        terms = 2 + 2 * len(self.frequencies)
+        coefficients = np.zeros((len(gaps), terms))
+        spread = np.full(len(gaps), np.nan)
+        fitted = np.zeros(len(gaps), dtype=bool)
+        gaps_per_chunk = max(1, self.max_values // (2 * side * terms))
+        for first in range(0, len(gaps), gaps_per_chunk):
+            chunk = gaps[first:first + gaps_per_chunk]
+            rows = chunk[:, None] + np.arange(-side + 1, side + 1)
+            valid = (rows >= 0) & (rows < len(epoch))
+            rows = np.clip(rows, 0, len(epoch) - 1)
+            offset = (epoch[rows] - epoch[chunk][:, None]).astype(float)
+            valid &= np.abs(offset) <= self.window
+            weight = valid.astype(float)
+
+            # Tidal terms only for this chunk's windows, so memory stays within max_values
+            design = self.design(offset, self.tidal((epoch[rows] - epoch[0]).astype(float)))
+            weighted = (design * weight[..., None]).transpose(0, 2, 1)
+            normal = weighted @ design
+            rhs = (weighted @ level[rows][..., None])[..., 0]
+            count = weight.sum(axis=1)
+            ok = count > terms
+            # A small ridge keeps short or uneven windows solvable
+            normal += 1e-9 * np.trace(normal, axis1=1, axis2=2)[:, None, None] * np.eye(terms)
+            solved = np.linalg.solve(normal[ok], rhs[ok][..., None])[..., 0]
+            residual = (level[rows[ok]] - (design[ok] @ solved[..., None])[..., 0]) * weight[ok]
+            index = np.arange(first, first + len(chunk))[ok]
+            coefficients[index] = solved
+            spread[index] = np.sqrt((residual * residual).sum(axis=1) / (count[ok] - terms))
+            fitted[index] = True
+
+        values, _ = LinearInterpolator().fill(series, owner, target)
+        use = fitted[gap_of]
+        design = self.design((target[use] - epoch[owner[use]]).astype(float),
+                             self.tidal((target[use] - epoch[0]).astype(float)))
+        values[use] = np.einsum('np,np->n', design, coefficients[gap_of[use]])
+        return values, spread[gap_of]
+
+
+INTERPOLATORS = {
+    cls.name: cls for cls in (MonteCarloInterpolator, LinearInterpolator, CubicSplineInterpolator,
+                              HarmonicInterpolator)
+}
+
+
+def make_interpolator(method='monte_carlo', num_simulations=1000, seed=None, expected=False):
+    """Return the interpolator for ``method`` (a name from ``INTERPOLATORS`` or an ``Interpolator``).
+
+    ``num_simulations``, ``seed`` and ``expected`` configure the Monte Carlo
+    method and are ignored by the others.
+    """
+    if isinstance(method, Interpolator):
+        return method
+    if method not in INTERPOLATORS:
+        raise ValueError(f"Unknown interpolator {method!r}; expected one of {', '.join(INTERPOLATORS)}")
+    if method == MonteCarloInterpolator.name:
+        return MonteCarloInterpolator(num_simulations, seed, expected)
+    return INTERPOLATORS[method]()
@@ -0,0 +1,23 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """Open a temporary file next to ``path`` and move it over ``path`` once the block succeeds.
+
+    Readers (and a run interrupted halfway) see either the previous file or
+    the complete new one, never a partial write. The temporary file is
+    removed when the block raises.
+    """
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(temp_path, mode) as handle:
+            yield handle
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,213 @@
+import itertools
+import re
+import time
+
+from .pipeline import process_file
+from .progress import ProgressChannel
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+# Longest a worker holds back progress reports (and goes without checking for cancellation)
+JOB_REPORT_INTERVAL = 0.1
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker when the job was cancelled."""
+
+
+class JobReporter(ProgressChannel):
+    """Worker side of a job's ``ProgressChannel``.
+
+    Events go to the job's manager queue, drained by ``JobManager.pump``.
+    Each send and each look at the cancel event is a round trip to the
+    manager process, so reports are batched: pending events are sent, and
+    cancellation checked, at most every ``interval`` seconds. A new stage
+    (a progress text that differs in more than its numbers), completion and
+    errors are sent at once; ``flush`` sends whatever is left. A cancelled
+    job stops at the next batch.
+    """
+
+    def __init__(self, job_id, events, cancel, interval=JOB_REPORT_INTERVAL):
+        super().__init__(events)
+        self.job_id = job_id
+        self.cancel = cancel
+        self.interval = interval
+        self.pending = []
+        self.stage = None
+        self.sent = float('-inf')
+
+    def check(self):
+        if self.cancel.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def flush(self):
+        if self.pending:
+            self.send(*self.pending)
+            self.pending = []
+        self.sent = time.monotonic()
+
+    def _report(self, event, urgent):
+        self.pending.append(event)
+        if urgent or time.monotonic() - self.sent >= self.interval:
+            self.check()
+            self.flush()
+
+    def message(self, text, level='info'):
+        self._report(('message', text, level), level in ('complete', 'error'))
+
+    def progress(self, fraction, text):
+        stage = re.sub(r'\d+', '#', text)
+        urgent = stage != self.stage or fraction >= 1.0
+        self.stage = stage
+        self._report(('progress', fraction, text), urgent)
+
+
+def _run_job(job_id, input_file_path, output_folder, options, events, cancel):
+    # Runs in a worker process; returns (state, summary, error)
+    reporter = JobReporter(job_id, events, cancel)
+    try:
+        reporter.progress(0.0, 'Starting...')
+        summary = process_file(input_file_path, output_folder, reporter, checkpoint=True, **options)
+    except JobCancelled:
+        return 'cancelled', None, None
+    except Exception as e:
+        return 'failed', None, str(e)
+    finally:
+        reporter.flush()
+    return 'completed', summary, None
+
+
+class Job:
+    """One queued run of ``process_file``; see ``JobManager``.
+
+    ``state`` is one of ``JOB_STATES`` and ``fraction``/``text`` the latest
+    progress, read from ``channel``. A completed job holds the run summary,
+    a failed one the error.
+    """
+
+    def __init__(self, job_id, input_file_path, output_folder, options):
+        self.id = job_id
+        self.input = input_file_path
+        self.output_folder = output_folder
+        self.options = options
+        self.state = 'queued'
+        self.fraction = 0.0
+        self.text = 'Queued'
+        self.summary = None
+        self.error = None
+        self.future = None
+        self.cancel_event = None
+        self.channel = None
+
+    @property
+    def finished(self):
+        return self.state in ('completed', 'failed', 'cancelled')
+
+
+class JobManager:
+    """Queues processing jobs on a process pool so a GUI stays responsive.
+
+    ``submit`` queues a run of ``process_file`` with checkpointing on and
+    returns its ``Job``; up to ``workers`` jobs run at once. ``cancel``
+    drops a queued job or stops a running one at its next batch of reports, and
+    ``resume`` queues a failed or cancelled job again: it restarts after its
+    last checkpointed stage. The owner calls ``pump`` at its own pace to
+    forward progress and collect finished jobs; nothing is called back from
+    other threads. Each run reports through its own ``ProgressChannel`` over a
+    manager queue; the pool and the manager are started with the first job.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.jobs = {}
+        self.executor = None
+        self.sync = None
+        self.ids = itertools.count(1)
+
+    def _start(self):
+        if self.executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Manager proxies can be passed to pool workers, plain queues and events cannot
+            self.sync = multiprocessing.Manager()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _queue(self, job):
+        self._start()
+        job.state, job.fraction, job.text = 'queued', 0.0, 'Queued'
+        job.summary = job.error = None
+        job.cancel_event = self.sync.Event()
+        job.channel = ProgressChannel(self.sync.Queue())
+        job.future = self.executor.submit(_run_job, job.id, job.input, job.output_folder, job.options,
+                                          job.channel.events, job.cancel_event)
+
+    def submit(self, input_file_path, output_folder, **options):
+        """Queue ``process_file(input_file_path, output_folder, **options)``; return its ``Job``."""
+        job_id = next(self.ids)
+        job = self.jobs[job_id] = Job(job_id, input_file_path, output_folder, options)
+        self._queue(job)
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs[job_id]
+        if job.finished:
+            return
+        if job.future.cancel():
+            job.state, job.text = 'cancelled', 'Cancelled'
+        else:
+            job.cancel_event.set()
+            job.text = 'Cancelling...'
+
+    def resume(self, job_id):
+        job = self.jobs[job_id]
+        if job.state not in ('failed', 'cancelled'):
+            raise ValueError(f"Job {job_id} is {job.state}; only failed or cancelled jobs can be resumed")
+        self._queue(job)
+        return job
+
+    @property
+    def active(self):
+        return any(not job.finished for job in self.jobs.values())
+
+    def pump(self, on_message=None, on_update=None):
+        """Forward everything reported since the last call.
+
+        ``on_message(job, text, level)`` gets every message and
+        ``on_update(job)`` is called once for each job whose state or progress
+        changed. Returns True while some job is queued or running.
+        """
+        # Futures done before the drain have already queued all of their events
+        running = [job for job in self.jobs.values() if not job.finished]
+        done = [job for job in running if job.future.done()]
+        changed = {}
+        for job in running:
+            messages, latest = job.channel.drain()
+            if on_message:
+                for text, level in messages:
+                    on_message(job, text, level)
+            if latest is not None:
+                job.fraction, job.text = latest
+                if job.state == 'queued':
+                    job.state = 'running'
+            if messages or latest is not None:
+                changed[job.id] = job
+        for job in done:
+            if job.future.cancelled():
+                job.state = 'cancelled'
+            else:
+                job.state, job.summary, job.error = job.future.result()
+            job.text = {'completed': 'Completed', 'failed': 'Failed', 'cancelled': 'Cancelled'}[job.state]
+            changed[job.id] = job
+        if on_update:
+            for job in changed.values():
+                on_update(job)
+        return self.active
+
+    def shutdown(self):
+        """Cancel every job and stop the pool without waiting for running jobs."""
+        for job in self.jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.sync.shutdown()
+            self.executor = self.sync = None
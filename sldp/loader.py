@@ -0,0 +1,150 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from .archive import StationArchive, is_archive
+from .io_utils import atomic_write
+from .profiling import StageTimer
+from .series import SeaLevelSeries
+
+COLUMNS = ['timestamp', 'sea_level']
+
+# Timestamp layouts tried in order on a sample of the file; slash dates are
+# month-first unless a day above 12 rules it out, as pandas reads them
+TIMESTAMP_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+)
+# Rows sampled from the head of the file and as many spread over the rest of it
+FORMAT_SAMPLE_SIZE = 100
+
+CACHE_SUFFIX = '.sldp-cache.npz'
+CACHE_VERSION = 2
+
+
+def detect_timestamp_format(values):
+    """Return the first of ``TIMESTAMP_FORMATS`` that parses every sample, or None."""
+    values = np.asarray(values, dtype=object)
+    spread = np.linspace(0, len(values) - 1, FORMAT_SAMPLE_SIZE).astype(np.intp) if len(values) else []
+    index = np.union1d(np.arange(min(FORMAT_SAMPLE_SIZE, len(values))), spread).astype(np.intp)
+    samples = pd.Series(values[index], dtype=object).dropna().astype(str)
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            pd.to_datetime(samples, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        return fmt
+    return None
+
+
+def parse_timestamps(values, fmt=None):
+    """Parse timestamp strings to datetime64[ns] with an explicit format.
+
+    ``fmt`` is detected from a sample of the rows when not given. ISO layouts go
+    through pandas' fixed-width ISO 8601 parser; unknown layouts fall back to
+    format inference.
+    """
+    if fmt is None:
+        fmt = detect_timestamp_format(values)
+    if fmt is None:
+        parsed = pd.to_datetime(values)
+    elif fmt.startswith('%Y-%m-%d'):
+        parsed = pd.to_datetime(values, format='ISO8601')
+    else:
+        parsed = pd.to_datetime(values, format=fmt)
+    return parsed.astype('datetime64[ns]')
+
+
+def read_raw(input_file_path, **kwargs):
+    # Tab-separated, no header: Date | Sea Level
+    return pd.read_csv(input_file_path, sep='\t', header=None, names=COLUMNS, **kwargs)
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(input_file_path):
+    return input_file_path + CACHE_SUFFIX
+
+
+def _cache_key(input_file_path, timestamp_format=None):
+    # A detected format depends only on the content, an explicit one must match
+    stat = os.stat(input_file_path)
+    return np.array([str(CACHE_VERSION), str(stat.st_size), str(stat.st_mtime_ns), file_digest(input_file_path),
+                     timestamp_format or ''])
+
+
+def _read_cache(path, key):
+    try:
+        with np.load(path) as cached:
+            if cached['key'].shape != key.shape or not (cached['key'] == key).all():
+                return None
+            return SeaLevelSeries(cached['epoch_ns'], cached['sea_level'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(path, key, series):
+    # The cache is optional: a folder that cannot be written only costs the speed-up
+    try:
+        with atomic_write(path, 'wb') as handle:
+            np.savez(handle, key=key, epoch_ns=series.epoch, sea_level=series.level)
+    except OSError:
+        pass
+
+
+def raw_to_series(raw, timestamp_format=None):
+    return SeaLevelSeries.from_times(parse_timestamps(raw['timestamp'], timestamp_format),
+                                     raw['sea_level'].to_numpy(dtype=float))
+
+
+def load_series(input_file_path, timestamp_format=None, cache=False, timer=None):
+    """Load a station file into a ``SeaLevelSeries`` with every sample flagged OK.
+
+    ``input_file_path`` may also be a binary station archive (see
+    ``sldp.archive``), which is read directly without parsing. With
+    ``cache=True`` the parsed int64 epoch and level arrays are stored in
+    ``<input>.sldp-cache.npz``, keyed by file size, mtime, content hash and
+    ``timestamp_format``, and reused on the next load of the unchanged file
+    with the same format. Reading and parsing are timed as the 'read' and
+    'parse' stages of ``timer`` when given, as in the streaming pipeline.
+    """
+    timer = timer or StageTimer()
+    with timer.stage('read') as stage:
+        series = raw = None
+        if is_archive(input_file_path):
+            series = StationArchive(input_file_path).series()
+        elif cache:
+            key = _cache_key(input_file_path, timestamp_format)
+            series = _read_cache(cache_path(input_file_path), key)
+        if series is None:
+            raw = read_raw(input_file_path)
+        stage.rows += len(series if raw is None else raw)
+    if raw is None:
+        return series
+
+    with timer.stage('parse', len(raw)):
+        series = raw_to_series(raw, timestamp_format)
+
+    if cache:
+        _write_cache(cache_path(input_file_path), key, series)
+    return series
+
+
+def load_data(input_file_path, timestamp_format=None, cache=False):
+    # DataFrame front end of load_series, with 'timestamp' and 'sea_level' columns
+    series = load_series(input_file_path, timestamp_format, cache)
+    return pd.DataFrame({'timestamp': series.times, 'sea_level': series.level})
@@ -0,0 +1,143 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .batch import collect_inputs, output_folders
+from .export import check_format, export_segments
+from .gaps import ONE_MINUTE, fill_series, infer_interval, max_step, to_interval
+from .loader import load_series
+from .progress import logging_reporter
+from .qc import format_qc_summary, qc_options, quality_control
+from .segments import segment_bounds
+from .series import FLAG_LABELS
+
+
+def station_names(inputs):
+    # Named after the input files, with the same suffixes batch mode gives repeated names
+    return [os.path.basename(folder) for folder in output_folders(inputs, '')]
+
+
+def align_stations(names, stations, grid=ONE_MINUTE, segment_ids=None):
+    """Place several stations on a shared time grid.
+
+    ``stations`` are ``SeaLevelSeries`` named by ``names``. The grid holds
+    every multiple of ``grid`` (since 1970) at which some station has a
+    sample; samples off the grid are left out. Returns a frame with a
+    'timestamp' column and '<name>_sea_level' / '<name>_check' columns per
+    station (NaN where a station has no sample) and an ``(rows, stations)``
+    array with each station's entry of ``segment_ids`` per row, -1 where it
+    has no sample. Without ``segment_ids`` every sample counts as segment 0.
+    """
+    step = to_interval(grid).astype(np.int64)
+    on_grid = [series.epoch % step == 0 for series in stations]
+    slots = [series.epoch[keep] // step for series, keep in zip(stations, on_grid)]
+    grid_slots = np.unique(np.concatenate(slots)) if slots else np.empty(0, dtype=np.int64)
+
+    columns = {'timestamp': (grid_slots * step).view('datetime64[ns]')}
+    ids = np.full((len(grid_slots), len(stations)), -1, dtype=np.int64)
+    for k, (name, series, keep, station_slots) in enumerate(zip(names, stations, on_grid, slots)):
+        rows = np.searchsorted(grid_slots, station_slots)
+        level = np.full(len(grid_slots), np.nan)
+        level[rows] = series.level[keep]
+        codes = np.full(len(grid_slots), -1, dtype=np.int8)
+        codes[rows] = series.flag[keep]
+        columns[f"{name}_sea_level"] = level
+        columns[f"{name}_check"] = pd.Categorical.from_codes(codes, categories=FLAG_LABELS)
+        ids[rows, k] = 0 if segment_ids is None else segment_ids[k][keep]
+    return pd.DataFrame(columns), ids
+
+
+def joint_segment_bounds(timestamps, ids, grid=ONE_MINUTE):
+    """Return ``(starts, stops)`` of the runs where every station in ``ids`` is continuous.
+
+    ``ids`` holds the per-station segment ids from ``align_stations`` for the
+    stations that must be continuous. A run breaks where one of them has no
+    sample, where it moves to its next segment, or where the grid skips a step.
+    """
+    times = np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+    present = (ids >= 0).all(axis=1)
+    joined = ((np.diff(times) == to_interval(grid).astype(np.int64))
+              & (ids[1:] == ids[:-1]).all(axis=1) & present[1:] & present[:-1])
+    starts = np.flatnonzero(present & np.concatenate(([True], ~joined)))
+    stops = np.flatnonzero(present & np.concatenate((~joined, [True]))) + 1
+    return starts, stops
+
+
+def process_stations(inputs, output_folder, reporter=None, require=None, grid=ONE_MINUTE, interval=None,
+                     max_fill=1, num_simulations=1000, seed=None, expected=False, output_format='xlsx',
+                     single_file=False, timestamp_format=None, cache=False, writers=1, interpolator='monte_carlo',
+                     qc=True):
+    """Merge several station files onto one time grid and export their joint segments.
+
+    ``inputs`` is a directory, a glob pattern or a list of paths; stations
+    are named after the files. Each station is loaded, gap-filled and
+    segmented on its own (``interval``, ``max_fill``, ``interpolator`` and
+    ``qc`` as in ``process_file``; seeds are derived per station from ``seed``). The
+    stations are then aligned on the ``grid`` with ``align_stations``, and
+    the runs where every station in ``require`` (all by default) is
+    continuous are exported as segments with one level and check column per
+    station. Returns a summary dict like ``process_file`` with the station
+    names under 'stations'.
+    """
+    reporter = reporter or logging_reporter()
+    check_format(output_format, single_file)
+    if isinstance(inputs, str):
+        inputs = collect_inputs(inputs)
+    if len(inputs) < 2:
+        raise ValueError("Merging needs at least two station files")
+    qc = qc_options(qc)
+    names = station_names(inputs)
+    required = list(names) if not require else list(require)
+    unknown = set(required) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown station {sorted(unknown)[0]!r}; expected one of {', '.join(names)}")
+    started = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+
+    reporter.message(f"Merging {len(inputs)} stations: {', '.join(names)}")
+    stations, segment_ids = [], []
+    num_rows = num_interpolated = 0
+    for k, (name, path, rng) in enumerate(zip(names, inputs, np.random.SeedSequence(seed).spawn(len(inputs)))):
+        reporter.progress(0.05 + 0.6 * k / len(inputs), f"Processing station {name}...")
+        series = load_series(path, timestamp_format, cache)
+        num_rows += len(series)
+        if qc is not None:
+            series, qc_summary = quality_control(series, **qc)
+            reporter.message(f"Station {name}: {format_qc_summary(qc_summary)}")
+        station_interval = to_interval(interval) if interval is not None else infer_interval(series.times)
+        filled = fill_series(series, station_interval, max_fill, num_simulations=num_simulations,
+                             seed=np.random.default_rng(rng), expected=expected, interpolator=interpolator)
+        starts, stops = segment_bounds(filled.times, max_step(station_interval, max_fill))
+        stations.append(filled)
+        segment_ids.append(np.repeat(np.arange(len(starts)), stops - starts))
+        num_interpolated += len(filled) - len(series)
+        reporter.message(f"Station {name}: {len(series)} data points, {len(filled) - len(series)} interpolated, "
+                         f"{len(starts)} segments.", "success")
+
+    reporter.progress(0.65, "Aligning stations...")
+    merged, ids = align_stations(names, stations, grid, segment_ids)
+    columns = [names.index(name) for name in required]
+    starts, stops = joint_segment_bounds(merged['timestamp'].to_numpy(), ids[:, columns], grid)
+    # Only rows inside a joint segment are exported; the bounds are renumbered to match
+    lengths = stops - starts
+    bounds = (np.cumsum(lengths) - lengths, np.cumsum(lengths))
+    rows = np.arange(lengths.sum()) + np.repeat(starts - bounds[0], lengths)
+    merged = merged.iloc[rows].reset_index(drop=True)
+    reporter.message(f"Identified {len(starts)} segments where {', '.join(required)} are all continuous.",
+                     "success")
+
+    reporter.progress(0.75, "Saving segments...")
+    output_files = export_segments(merged, bounds, output_folder, reporter, output_format, single_file, writers)
+    reporter.message("Treatment completed successfully!", "complete")
+    reporter.progress(1.0, "Completed")
+    return {
+        'input': list(inputs),
+        'stations': names,
+        'rows': num_rows,
+        'interpolated': num_interpolated,
+        'segments': len(starts),
+        'files': output_files,
+        'elapsed': time.perf_counter() - started,
+    }
@@ -0,0 +1,250 @@
+import os
+import time
+
+import pandas as pd
+
+from .catalog import check_catalog_format, segment_catalog, write_catalog
+from .checkpoint import StageCheckpoint, checkpoint_key
+from .export import check_format, export_segments
+from .gaps import fill_series, infer_interval, max_step, to_interval
+from .interpolation import make_interpolator
+from .loader import load_series
+from .preview import build_pyramid, write_preview
+from .products import product_names, write_products
+from .profiling import StageTimer, format_timing, profile_tools
+from .progress import logging_reporter
+from .qc import format_qc_summary, qc_options, quality_control
+from .results import ResultCache, output_paths, release_links
+from .segments import segment_bounds
+from .incremental import process_file_incremental
+from .stream import DEFAULT_CHUNK_SIZE, process_file_streaming
+
+
+def process_file(input_file_path, output_folder, reporter=None, interval=None, max_fill=1, num_simulations=1000,
+                 seed=None, expected=False, output_format='xlsx', single_file=False, chunk_size=None,
+                 timestamp_format=None, cache=False, incremental=False, writers=1, catalog='csv', profile=False,
+                 interpolator='monte_carlo', uncertainty=False, qc=True, checkpoint=False, preview=False, products=None,
+                 result_cache=False):
+    """Run load -> QC -> gap-fill -> segment -> export on one station file.
+
+    Progress goes to ``reporter`` (a ``ProgressReporter``; the 'sldp' logger by
+    default). ``interval`` is the nominal sampling interval, inferred from the
+    data when None; gaps of up to ``max_fill`` samples are filled and longer
+    ones start a new segment. Unless ``qc`` is False the data is checked
+    first by ``sldp.qc.quality_control``, with ``qc`` a dict of its options
+    or True for the defaults. Gaps are filled by ``interpolator`` (see
+    ``sldp.interpolation.INTERPOLATORS``; ``num_simulations``, ``seed`` and
+    ``expected`` configure the Monte Carlo method) and ``uncertainty=True``
+    adds its standard deviation per filled sample to the output.
+    ``output_format`` and ``single_file`` select the
+    writer and ``writers`` the number of concurrent segment writers, see
+    ``export_segments``. With ``chunk_size`` set the file is streamed in chunks
+    of that many rows, see ``process_file_streaming``. ``timestamp_format`` and
+    ``cache`` are passed to ``load_series``. With ``incremental=True`` only the
+    data added since the previous run into ``output_folder`` is processed, see
+    ``process_file_incremental``. A catalog with per-segment statistics is
+    written in the ``catalog`` format (see ``sldp.catalog``) unless it is
+    None. Returns a summary dict with the row, gap and segment counts, the
+    QC summary, the written files and the elapsed time in seconds.
+
+    With ``profile`` set every stage is timed and a JSON timing report
+    (``sldp-timing.json``) is written to ``output_folder``, its table
+    reported and the report added to the summary under 'timing'. ``profile``
+    may also list tools from ``sldp.profiling.PROFILE_TOOLS`` ('cprofile',
+    'tracemalloc') to capture with the timings.
+
+    With ``checkpoint=True`` the result of every finished stage is kept in
+    ``output_folder/.sldp-checkpoint`` (see ``sldp.checkpoint``), so a run
+    that failed or was cancelled resumes after its last finished stage when
+    started again with the same input and options. The checkpoint is removed
+    once the run completes. Streaming and incremental runs cannot checkpoint.
+
+    With ``preview=True`` a min/max decimation pyramid is built while the
+    data is segmented and written with the samples to
+    ``output_folder/sldp-preview`` for plotting (see ``sldp.preview``); its
+    path is added to the summary under 'preview'. Only in-memory runs build
+    previews.
+
+    ``products`` lists derived products from ``sldp.products.PRODUCTS``
+    ('hourly' and 'daily' means, tidal 'extrema'; True for all) computed
+    from the segmented series and written next to the segments in the same
+    format; their paths are added to the summary under 'products'. Only
+    in-memory runs derive products.
+
+    With ``result_cache`` set (True for the default folder, a folder or a
+    ``sldp.results.ResultCache``) the outputs are kept in a cache keyed by
+    the input bytes, the options that change them and the package version.
+    Rerunning an unchanged input with the same options links the outputs
+    back instead of processing it; the summary then has 'cached' set. With
+    ``profile`` a hit still writes a timing report, with 'cached' set and
+    only the 'result_cache' stage. Incremental runs are not cached.
+    """
+    if incremental and single_file:
+        raise ValueError("Incremental mode writes one file per segment and cannot use single-file output")
+    if checkpoint and (incremental or chunk_size):
+        raise ValueError("Only in-memory runs can checkpoint, not streaming or incremental ones")
+    if preview and (incremental or chunk_size):
+        raise ValueError("Only in-memory runs can build a preview, not streaming or incremental ones")
+    if products and (incremental or chunk_size):
+        raise ValueError("Only in-memory runs can derive products, not streaming or incremental ones")
+    if result_cache and incremental:
+        raise ValueError("Incremental runs already skip processed data and cannot use the result cache")
+    reporter = reporter or logging_reporter()
+    qc = qc_options(qc)
+    products = product_names(products)
+    # Every option that changes the outputs; the result cache and checkpoint keys both hash it
+    options = {'interval': interval, 'max_fill': max_fill, 'num_simulations': num_simulations, 'seed': seed,
+               'expected': expected, 'output_format': output_format, 'single_file': single_file,
+               'chunk_size': chunk_size, 'timestamp_format': timestamp_format, 'catalog': catalog,
+               'interpolator': getattr(interpolator, 'name', interpolator), 'uncertainty': uncertainty, 'qc': qc,
+               'preview': preview, 'products': products}
+    started = time.perf_counter()
+    timer = StageTimer(profile_tools(profile))
+    summary = results = key = None
+    with timer.running():
+        if result_cache:
+            results = result_cache if isinstance(result_cache, ResultCache) else \
+                ResultCache(None if result_cache is True else result_cache)
+            with timer.stage('result_cache'):
+                key = results.key(input_file_path, options)
+                summary = results.restore(key, output_folder)
+        if summary is not None:
+            reporter.message(f"Input and options unchanged since an earlier run: restored its {summary['segments']} "
+                             f"segments from the result cache.", "success")
+            reporter.message("Treatment completed successfully!", "complete")
+            reporter.progress(1.0, "Completed")
+            summary.update(input=input_file_path, cached=True, elapsed=time.perf_counter() - started)
+        else:
+            summary = _process(input_file_path, output_folder, reporter, timer, options, cache=cache,
+                               incremental=incremental, writers=writers, interpolator=interpolator,
+                               checkpoint=checkpoint)
+            if results is not None:
+                with timer.stage('result_cache'):
+                    results.store(key, output_folder, summary, output_paths(summary, output_folder, catalog))
+                summary['cached'] = False
+    if profile:
+        # A cache hit gets a report too, with only the 'result_cache' stage and 'cached' set
+        summary['timing'] = timer.write(output_folder, summary)
+        reporter.message(f"Stage timings:\n{format_timing(summary['timing'])}")
+        reporter.message(f"Wrote timing report to {summary['timing']['timing_file']}", "success")
+    return summary
+
+
+def _process(input_file_path, output_folder, reporter, timer, options, *, cache, incremental, writers, interpolator,
+             checkpoint):
+    # Runs the mode selected by the options; ``interpolator`` may be an instance, options only hold its name
+    release_links(output_folder)
+    common = {name: options[name] for name in ('interval', 'max_fill', 'num_simulations', 'seed', 'expected',
+                                              'output_format', 'timestamp_format', 'catalog', 'uncertainty', 'qc')}
+    if incremental:
+        return process_file_incremental(input_file_path, output_folder, reporter,
+                                        chunk_size=options['chunk_size'] or DEFAULT_CHUNK_SIZE, timer=timer,
+                                        interpolator=interpolator, **common)
+    if options['chunk_size']:
+        return process_file_streaming(input_file_path, output_folder, reporter, chunk_size=options['chunk_size'],
+                                      single_file=options['single_file'], timer=timer, interpolator=interpolator,
+                                      **common)
+    if checkpoint:
+        checkpoint = StageCheckpoint(output_folder, checkpoint_key(input_file_path, options))
+    return _process_in_memory(input_file_path, output_folder, reporter, timer, single_file=options['single_file'],
+                              cache=cache, writers=writers, interpolator=interpolator, checkpoint=checkpoint,
+                              preview=options['preview'], products=options['products'], **common)
+
+
+def _process_in_memory(input_file_path, output_folder, reporter, timer, *, interval, max_fill, num_simulations, seed,
+                       expected, output_format, single_file, timestamp_format, cache, writers, catalog, interpolator,
+                       uncertainty, qc, checkpoint=None, preview=False, products=()):
+    check_format(output_format, single_file)
+    check_catalog_format(catalog)
+    interpolator = make_interpolator(interpolator, num_simulations, seed, expected)
+    started = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+
+    reporter.message("Treatment started...")
+    if checkpoint and checkpoint.last:
+        reporter.message(f"Resuming after the {checkpoint.last} stage of the previous run.")
+
+    if checkpoint and 'qc' in checkpoint:
+        # Load and QC are checkpointed together: the checked series is what gap filling needs
+        series = checkpoint.series('gap_fill' if 'gap_fill' in checkpoint else 'qc')
+        num_rows, qc_summary, interval = (checkpoint.meta('qc')[name] for name in ('rows', 'qc', 'interval_ns'))
+        interval = to_interval(interval)
+    else:
+        reporter.progress(0.05, "Loading data...")
+        series = load_series(input_file_path, timestamp_format, cache, timer)
+        num_rows = len(series)
+        reporter.message(f"Data loaded successfully. Found {num_rows} data points.", "success")
+
+        qc_summary = None
+        if qc is not None:
+            reporter.progress(0.15, "Checking data quality...")
+            with timer.stage('qc', num_rows):
+                series, qc_summary = quality_control(series, **qc)
+            reporter.message(format_qc_summary(qc_summary), "warning" if qc_summary['dropped'] else "info")
+
+        interval = to_interval(interval) if interval is not None else infer_interval(series.times)
+        reporter.message(f"Sampling interval: {pd.Timedelta(interval).total_seconds():g} seconds.")
+        if checkpoint:
+            checkpoint.save('qc', series, rows=num_rows, qc=qc_summary, interval_ns=pd.Timedelta(interval).value)
+
+    if checkpoint and 'gap_fill' in checkpoint:
+        num_interpolated = checkpoint.meta('gap_fill')['interpolated']
+    else:
+        reporter.progress(0.25, "Checking for time gaps...")
+        reporter.message(f"Checking for time gaps and interpolating using {interpolator.label}...")
+        num_checked = len(series)
+        with timer.stage('gap_fill', num_checked):
+            series = fill_series(series, interval, max_fill, interpolator=interpolator, uncertainty=uncertainty)
+        num_interpolated = len(series) - num_checked
+        reporter.message(f"Interpolated {num_interpolated} data points using {interpolator.label}.", "success")
+        if checkpoint:
+            checkpoint.save('gap_fill', series, interpolated=num_interpolated)
+
+    reporter.progress(0.65, "Identifying segments...")
+    reporter.message("Identifying segments...")
+    with timer.stage('segment', len(series)):
+        bounds = segment_bounds(series.times, max_step(interval, max_fill))
+        pyramid = build_pyramid(series, bounds) if preview else None
+    reporter.message(f"Identified {len(bounds[0])} segments.", "success")
+
+    if checkpoint and 'export' in checkpoint:
+        output_files = checkpoint.meta('export')['files']
+    else:
+        reporter.progress(0.75, "Saving segments...")
+        with timer.stage('export', len(series)):
+            output_files = export_segments(series, bounds, output_folder, reporter, output_format, single_file,
+                                           writers)
+        if checkpoint:
+            checkpoint.save('export', files=output_files)
+    if catalog:
+        files = output_files * len(bounds[0]) if single_file else output_files
+        with timer.stage('catalog', len(series)):
+            path = write_catalog(segment_catalog(series, bounds, files), output_folder, catalog)
+        reporter.message(f"Wrote segment catalog to {path}", "success")
+    product_files = {}
+    if products:
+        reporter.progress(0.97, "Deriving products...")
+        with timer.stage('products', len(series)):
+            product_files = write_products(series, bounds, interval, output_folder, output_format, products)
+        reporter.message(f"Wrote {', '.join(products)} products to {output_folder}", "success")
+    preview_folder = None
+    if preview:
+        with timer.stage('preview', len(series)):
+            preview_folder = write_preview(output_folder, series, bounds, pyramid)
+        reporter.message(f"Wrote plot preview to {preview_folder}", "success")
+    if checkpoint:
+        checkpoint.clear()
+
+    reporter.message("Treatment completed successfully!", "complete")
+    reporter.progress(1.0, "Completed")
+    return {
+        'input': input_file_path,
+        'rows': num_rows,
+        'interpolated': num_interpolated,
+        'segments': len(bounds[0]),
+        'qc': qc_summary,
+        'files': output_files,
+        'products': product_files,
+        'preview': preview_folder,
+        'elapsed': time.perf_counter() - started,
+    }
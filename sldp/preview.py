@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .series import INTERPOLATED
+
+PREVIEW_DIR = 'sldp-preview'
+PREVIEW_FILE = 'preview.json'
+PREVIEW_VERSION = 1
+# Samples per bucket at the finest decimated level, and buckets merged per coarser level
+PREVIEW_BUCKET = 16
+PREVIEW_FACTOR = 4
+# Levels are added until one has at most this many buckets (or segments stop it shrinking)
+PREVIEW_TOP = 1024
+BUCKET_FIELDS = ('start', 'stop', 'low', 'high', 'interpolated', 'segment')
+
+
+def _reduce(values, starts, stops, segment):
+    # Buckets [starts[k], stops[k]) of the finer level (or of the samples) merged into one each
+    return {
+        'start': values['start'][starts],
+        'stop': values['stop'][stops - 1],
+        'low': np.minimum.reduceat(values['low'], starts),
+        'high': np.maximum.reduceat(values['high'], starts),
+        'interpolated': np.add.reduceat(values['interpolated'], starts),
+        'segment': segment,
+    }
+
+
+def decimate(series, bounds, bucket=PREVIEW_BUCKET):
+    """Min/max buckets of ``bucket`` consecutive samples of ``series``, never across segments.
+
+    Each bucket has the epoch of its first and last sample ('start',
+    'stop'), the lowest and highest level ('low', 'high'), the number of
+    interpolated samples and its segment number (from 0).
+    """
+    starts, stops = (np.asarray(bound, dtype=np.intp) for bound in bounds)
+    counts = -(-(stops - starts) // bucket)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = starts[segment] + local * bucket
+    last = np.minimum(first + bucket, stops[segment])
+    samples = {'start': series.epoch, 'stop': series.epoch, 'low': series.level, 'high': series.level,
+               'interpolated': (series.flag == INTERPOLATED).astype(np.int32)}
+    return _reduce(samples, first, last, segment)
+
+
+def coarsen(buckets, factor=PREVIEW_FACTOR):
+    # Every ``factor`` consecutive buckets of one segment become one bucket
+    segment = buckets['segment']
+    index = np.arange(len(segment))
+    new_segment = np.concatenate(([True], segment[1:] != segment[:-1]))
+    local = index - np.maximum.accumulate(np.where(new_segment, index, 0))
+    starts = np.flatnonzero(local % factor == 0)
+    stops = np.concatenate((starts[1:], [len(segment)]))
+    return _reduce(buckets, starts, stops, segment[starts])
+
+
+def build_pyramid(series, bounds, bucket=PREVIEW_BUCKET, factor=PREVIEW_FACTOR, top=PREVIEW_TOP):
+    """Min/max decimation pyramid of ``series`` split at the segment ``bounds``.
+
+    Level 0 holds buckets of ``bucket`` samples (see ``decimate``); each
+    further level merges ``factor`` buckets of the one below, up to a level
+    of at most ``top`` buckets. Every level is built with ``reduceat``, so
+    the whole pyramid costs a few vectorized passes over the samples.
+    """
+    if len(series) == 0:
+        return []
+    levels = [decimate(series, bounds, bucket)]
+    while len(levels[-1]['start']) > top:
+        coarser = coarsen(levels[-1], factor)
+        if len(coarser['start']) == len(levels[-1]['start']):
+            break
+        levels.append(coarser)
+    return levels
+
+
+def write_preview(output_folder, series, bounds, pyramid=None):
+    """Write the samples, segments and pyramid to ``output_folder/sldp-preview``; return the folder.
+
+    Every array is its own ``.npy`` file so ``Preview`` can map it and read
+    only the range on screen.
+    """
+    if pyramid is None:
+        pyramid = build_pyramid(series, bounds)
+    folder = os.path.join(output_folder, PREVIEW_DIR)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    starts, stops = bounds
+    arrays = {'epoch': series.epoch, 'level': series.level, 'flag': series.flag,
+              'segment_start': series.epoch[starts], 'segment_stop': series.epoch[np.asarray(stops) - 1]}
+    for k, level in enumerate(pyramid):
+        arrays.update({f"level{k}_{field}": level[field] for field in BUCKET_FIELDS})
+    for name, values in arrays.items():
+        np.save(os.path.join(folder, f"{name}.npy"), values)
+    meta = {'version': PREVIEW_VERSION, 'rows': len(series), 'segments': len(starts), 'levels': len(pyramid),
+            'bucket': PREVIEW_BUCKET, 'factor': PREVIEW_FACTOR}
+    with open(os.path.join(folder, PREVIEW_FILE), 'w') as handle:
+        json.dump(meta, handle, indent=2)
+    return folder
+
+
+class Preview:
+    """Reads a preview written by ``write_preview`` for plotting.
+
+    ``columns(start, stop, width)`` returns the visible range (epochs in ns)
+    folded into at most ``width`` pixel columns, read from the coarsest
+    pyramid level that still has a bucket per column, or from the samples
+    when zoomed in that far. Arrays are memory-mapped, so only the visible
+    part of a level is read.
+    """
+
+    def __init__(self, output_folder):
+        self.folder = os.path.join(output_folder, PREVIEW_DIR)
+        with open(os.path.join(self.folder, PREVIEW_FILE)) as handle:
+            self.meta = json.load(handle)
+        if self.meta.get('version') != PREVIEW_VERSION:
+            raise ValueError(f"Unsupported preview version {self.meta.get('version')!r}")
+        self.segment_start = self._load('segment_start')
+        self.segment_stop = self._load('segment_stop')
+
+    def _load(self, name):
+        return np.load(os.path.join(self.folder, f"{name}.npy"), mmap_mode='r')
+
+    @property
+    def span(self):
+        # Epochs of the first and last sample, or None for an empty series
+        if len(self.segment_start) == 0:
+            return None
+        return int(self.segment_start[0]), int(self.segment_stop[-1])
+
+    def segments(self, start, stop):
+        # Numbers and epoch ranges of the segments overlapping [start, stop]
+        first = np.searchsorted(self.segment_stop, start)
+        last = np.searchsorted(self.segment_start, stop, side='right')
+        return (np.arange(first, last), np.asarray(self.segment_start[first:last]),
+                np.asarray(self.segment_stop[first:last]))
+
+    def window(self, start, stop, width):
+        """Buckets overlapping [start, stop] at the coarsest level with at least ``width`` of them.
+
+        Returns the bucket fields of ``decimate`` and the level read, -1 for
+        the samples themselves.
+        """
+        for k in reversed(range(self.meta['levels'])):
+            starts, stops = self._load(f"level{k}_start"), self._load(f"level{k}_stop")
+            first = np.searchsorted(stops, start)
+            last = np.searchsorted(starts, stop, side='right')
+            if last - first >= width:
+                return {field: np.asarray(self._load(f"level{k}_{field}")[first:last])
+                        for field in BUCKET_FIELDS}, k
+        epoch = self._load('epoch')
+        first = np.searchsorted(epoch, start)
+        last = np.searchsorted(epoch, stop, side='right')
+        epoch, level = np.asarray(epoch[first:last]), np.asarray(self._load('level')[first:last])
+        interpolated = (np.asarray(self._load('flag')[first:last]) == INTERPOLATED).astype(np.int32)
+        segment = np.searchsorted(self.segment_start, epoch, side='right') - 1
+        return {'start': epoch, 'stop': epoch, 'low': level, 'high': level, 'interpolated': interpolated,
+                'segment': segment}, -1
+
+    def columns(self, start, stop, width):
+        """Fold the window into pixel columns: ``(x, low, high, interpolated)`` arrays.
+
+        ``x`` is the column (0 to ``width - 1``) of every non-empty column and
+        ``interpolated`` tells whether it holds interpolated samples.
+        """
+        buckets, _ = self.window(start, stop, width)
+        scale = width / max(stop - start, 1)
+        x = np.clip(((buckets['start'] - start) * scale).astype(np.int64), 0, width - 1)
+        if len(x) == 0:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty, empty.astype(bool)
+        first = np.flatnonzero(np.concatenate(([True], x[1:] != x[:-1])))
+        return (x[first], np.minimum.reduceat(buckets['low'], first), np.maximum.reduceat(buckets['high'], first),
+                np.add.reduceat(buckets['interpolated'], first) > 0)
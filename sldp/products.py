@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .export import WRITERS, check_format
+from .series import INTERPOLATED
+
+PRODUCTS = ('hourly', 'daily', 'extrema')
+PRODUCT_FILES = {'hourly': 'hourly_means', 'daily': 'daily_means', 'extrema': 'tidal_extrema'}
+# High and low waters: turning points of the smoothed level within this centred window
+EXTREMA_WINDOW = pd.Timedelta('6h')
+EXTREMA_SMOOTHING = pd.Timedelta('30min')
+
+
+def product_names(products):
+    # products is False/None, True (all of them) or a list of PRODUCTS names
+    if not products:
+        return ()
+    if products is True:
+        return PRODUCTS
+    names = (products,) if isinstance(products, str) else tuple(products)
+    unknown = set(names) - set(PRODUCTS)
+    if unknown:
+        raise ValueError(f"Unknown product {sorted(unknown)[0]!r}; expected one of {PRODUCTS}")
+    return names
+
+
+def segment_rows(bounds):
+    # Segment number (from 0) of every row; the bounds cover the series from its first row
+    starts, stops = (np.asarray(bound, dtype=np.intp) for bound in bounds)
+    return np.repeat(np.arange(len(starts)), stops - starts)
+
+
+def period_means(series, bounds, period='1h'):
+    """Mean level of every ``period`` (hourly by default) of every segment.
+
+    Periods are aligned to multiples of ``period`` since 1970 and split
+    where a segment ends, so each row belongs to one segment. Returns a
+    frame with the segment id (from 1), the start of the period, the mean
+    level and the number of samples and of interpolated samples averaged.
+    """
+    step = pd.Timedelta(period).value
+    segment = segment_rows(bounds)
+    bins = series.epoch // step
+    new = np.ones(len(bins), dtype=bool)
+    new[1:] = (bins[1:] != bins[:-1]) | (segment[1:] != segment[:-1])
+    first = np.flatnonzero(new)
+    samples = np.diff(np.append(first, len(bins)))
+    return pd.DataFrame({
+        'segment_id': segment[first] + 1,
+        'timestamp': (bins[first] * step).view('datetime64[ns]'),
+        'sea_level': np.add.reduceat(series.level.astype(np.float64), first) / samples,
+        'samples': samples,
+        'interpolated': np.add.reduceat((series.flag == INTERPOLATED).astype(np.int64), first),
+    })
+
+
+def tidal_extrema(series, bounds, interval, window=EXTREMA_WINDOW, smoothing=EXTREMA_SMOOTHING):
+    """High and low waters of every segment.
+
+    The level is smoothed with a centred rolling mean over ``smoothing``;
+    a high (low) water is a sample where the smoothed level is the highest
+    (lowest) within the centred ``window``, which must lie inside the
+    segment. Windows are counted in samples of ``interval``, so segments
+    are assumed to be evenly sampled, as they are once gaps are filled. Of
+    equal turning points closer than half a window only the first is kept.
+    Returns a frame with the segment id (from 1), the time, 'high' or
+    'low' and the smoothed level, in time order.
+    """
+    step = pd.Timedelta(interval).value
+    half = max(1, int(pd.Timedelta(window).value // (2 * step)))
+    smooth = max(1, int(pd.Timedelta(smoothing).value // step))
+    starts, stops = (np.asarray(bound, dtype=np.intp) for bound in bounds)
+    lengths = stops - starts
+    segment = segment_rows(bounds)
+
+    # Segments are laid out apart with NaN padding so no rolling window mixes two of them
+    pad = half + smooth
+    rows = np.arange(len(segment)) + segment * pad
+    padded = np.full(len(segment) + len(starts) * pad, np.nan)
+    padded[rows] = series.level
+    smoothed = pd.Series(padded).rolling(smooth, center=True, min_periods=1).mean()
+    rolling = smoothed.rolling(2 * half + 1, center=True, min_periods=1)
+    highest, lowest = rolling.max().to_numpy()[rows], rolling.min().to_numpy()[rows]
+    smoothed = smoothed.to_numpy()[rows]
+
+    local = np.arange(len(segment)) - np.repeat(starts, lengths)
+    inside = (local >= half) & (local < np.repeat(lengths, lengths) - half)
+    found = []
+    for kind, extreme in (('high', highest), ('low', lowest)):
+        index = np.flatnonzero(inside & (smoothed == extreme))
+        keep = np.ones(len(index), dtype=bool)
+        keep[1:] = (np.diff(index) > half) | (segment[index[1:]] != segment[index[:-1]])
+        found.append((index[keep], kind))
+    index = np.concatenate([index for index, _ in found])
+    kinds = np.concatenate([np.full(len(index), kind) for index, kind in found])
+    order = np.argsort(index, kind='stable')
+    index, kinds = index[order], kinds[order]
+    return pd.DataFrame({
+        'segment_id': segment[index] + 1,
+        'timestamp': series.times[index],
+        'type': pd.Categorical(kinds, categories=['high', 'low']),
+        'sea_level': smoothed[index],
+    })
+
+
+def derived_products(series, bounds, interval, products=PRODUCTS):
+    """Frames of the ``products`` (see ``PRODUCTS``) of a segmented series, by name."""
+    frames = {}
+    for name in product_names(products):
+        if name == 'hourly':
+            frames[name] = period_means(series, bounds, '1h')
+        elif name == 'daily':
+            frames[name] = period_means(series, bounds, '1D')
+        else:
+            frames[name] = tidal_extrema(series, bounds, interval)
+    return frames
+
+
+def write_products(series, bounds, interval, output_folder, output_format='csv', products=PRODUCTS):
+    """Write the derived ``products`` next to the segments, in their format; return the paths by name."""
+    check_format(output_format)
+    paths = {}
+    for name, frame in derived_products(series, bounds, interval, products).items():
+        paths[name] = os.path.join(output_folder, f"{PRODUCT_FILES[name]}.{output_format}")
+        WRITERS[output_format](frame, paths[name])
+    return paths
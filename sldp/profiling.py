@@ -0,0 +1,192 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TIMING_FILE = 'sldp-timing.json'
+PROFILE_FILE = 'sldp-profile.prof'
+PROFILE_TOOLS = ('cprofile', 'tracemalloc')
+# Functions listed in the report when cProfile is on, by cumulative time
+PROFILE_TOP = 25
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def profile_tools(profile):
+    # profile is False/None, True (timings only) or a list of PROFILE_TOOLS names
+    if not profile or profile is True:
+        return ()
+    tools = (profile,) if isinstance(profile, str) else tuple(profile)
+    unknown = set(tools) - set(PROFILE_TOOLS)
+    if unknown:
+        raise ValueError(f"Unknown profiling tool {sorted(unknown)[0]!r}; expected one of {PROFILE_TOOLS}")
+    return tools
+
+
+class Stage:
+    __slots__ = ('name', 'calls', 'wall', 'cpu', 'rows', 'peak_rss_mb', 'peak_traced_mb')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = self.cpu = 0.0
+        self.rows = 0
+        self.peak_rss_mb = self.peak_traced_mb = None
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'calls': self.calls,
+            'wall_seconds': self.wall,
+            'cpu_seconds': self.cpu,
+            'rows': self.rows,
+            'rows_per_second': self.rows / self.wall if self.wall > 0 else None,
+            'peak_rss_mb': self.peak_rss_mb,
+            'peak_traced_mb': self.peak_traced_mb,
+        }
+
+
+class StageTimer:
+    """Accumulates wall time, CPU time, rows and peak memory per pipeline stage.
+
+    Stages are timed with ``with timer.stage(name, rows):``; a stage entered
+    repeatedly (once per chunk when streaming) is summed. ``tools`` turns on
+    cProfile and/or tracemalloc for the whole ``running()`` block, see
+    ``PROFILE_TOOLS``; tracemalloc adds the peak traced allocation per stage.
+    """
+
+    def __init__(self, tools=()):
+        self.tools = tuple(tools)
+        self.stages = {}
+        self.profiler = None
+        self.wall = self.cpu = 0.0
+
+    @contextmanager
+    def running(self):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        trace = 'tracemalloc' in self.tools and not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+        if 'cprofile' in self.tools:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        try:
+            yield self
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            if trace:
+                tracemalloc.stop()
+            self.wall += time.perf_counter() - started
+            self.cpu += time.process_time() - cpu_started
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall += time.perf_counter() - started
+            stage.cpu += time.process_time() - cpu_started
+            stage.calls += 1
+            stage.rows += rows
+            stage.peak_rss_mb = peak_rss_mb()
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] / (1 << 20)
+                stage.peak_traced_mb = max(stage.peak_traced_mb or 0.0, peak)
+
+    def iterate(self, name, iterable):
+        # Times each step of an iterator (chunked readers) as one more call of stage ``name``
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stage:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stage.calls -= 1
+                    return
+                stage.rows += len(item)
+            yield item
+
+    def report(self, summary=None):
+        """Return the timing report as a JSON-ready dict, with the run ``summary`` counts if given."""
+        from . import __version__
+
+        report = {'version': __version__}
+        if summary is not None:
+            report.update({key: summary[key] for key in ('input', 'rows', 'interpolated', 'segments', 'cached')
+                           if key in summary})
+        report.update({
+            'wall_seconds': self.wall,
+            'cpu_seconds': self.cpu,
+            'peak_rss_mb': peak_rss_mb(),
+            'tools': list(self.tools),
+            'stages': [stage.as_dict() for stage in self.stages.values()],
+        })
+        if self.profiler is not None:
+            report['profile'] = top_functions(self.profiler)
+        return report
+
+    def write(self, output_folder, summary=None):
+        """Write the report (and cProfile stats) into ``output_folder``; return the report."""
+        report = self.report(summary)
+        if self.profiler is not None:
+            path = os.path.join(output_folder, PROFILE_FILE)
+            self.profiler.dump_stats(path)
+            report['profile_file'] = path
+        path = os.path.join(output_folder, TIMING_FILE)
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        report['timing_file'] = path
+        return report
+
+
+def top_functions(profiler, limit=PROFILE_TOP):
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        'function': f"{os.path.basename(filename)}:{line}({name})",
+        'calls': calls,
+        'total_seconds': total,
+        'cumulative_seconds': cumulative,
+    } for (filename, line, name), (_, calls, total, cumulative, _) in rows]
+
+
+def format_timing(report):
+    """Render the per-stage part of a timing report as a text table."""
+    traced = 'tracemalloc' in report['tools']
+    header = f"{'stage':<10} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'rows/s':>12} {'peak RSS MB':>12}"
+    if traced:
+        header += f" {'traced MB':>10}"
+    lines = [header, '-' * len(header)]
+    for stage in report['stages']:
+        rate = f"{stage['rows_per_second']:,.0f}" if stage['rows_per_second'] else '-'
+        rss = f"{stage['peak_rss_mb']:.1f}" if stage['peak_rss_mb'] is not None else '-'
+        line = (f"{stage['stage']:<10} {stage['calls']:>6} {stage['wall_seconds']:>9.3f} "
+                f"{stage['cpu_seconds']:>9.3f} {rate:>12} {rss:>12}")
+        if traced:
+            line += f" {stage['peak_traced_mb'] or 0.0:>10.1f}"
+        lines.append(line)
+    lines.append(f"{'total':<10} {'':>6} {report['wall_seconds']:>9.3f} {report['cpu_seconds']:>9.3f}")
+    return '\n'.join(lines)
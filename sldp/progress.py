@@ -0,0 +1,88 @@
+import logging
+import queue
+
+logger = logging.getLogger('sldp')
+
+# Message levels follow the status box tags used by the GUI
+LOG_LEVELS = {
+    'info': logging.INFO,
+    'success': logging.INFO,
+    'complete': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+
+class ProgressReporter:
+    """Receives pipeline messages and progress updates.
+
+    ``on_message(text, level)`` gets log lines and ``on_progress(fraction, text)``
+    gets the overall completion in [0, 1]. Either callback may be omitted.
+    """
+
+    def __init__(self, on_message=None, on_progress=None):
+        self.on_message = on_message
+        self.on_progress = on_progress
+
+    def message(self, text, level='info'):
+        if self.on_message:
+            self.on_message(text, level)
+
+    def progress(self, fraction, text):
+        if self.on_progress:
+            self.on_progress(fraction, text)
+
+
+def logging_reporter(log=logger):
+    def on_message(text, level):
+        log.log(LOG_LEVELS.get(level, logging.INFO), text)
+
+    def on_progress(fraction, text):
+        log.debug("%3d%% %s", round(fraction * 100), text)
+
+    return ProgressReporter(on_message, on_progress)
+
+
+class ProgressChannel(ProgressReporter):
+    """Thread-safe reporter that queues events for another thread to consume.
+
+    The worker reports into the channel without ever blocking; the consumer
+    calls ``drain`` at its own pace, which returns every queued message but
+    only the latest progress update. ``events`` may be any queue with ``put``
+    and ``get_nowait``, such as a multiprocessing manager queue shared with a
+    worker process.
+    """
+
+    def __init__(self, events=None):
+        super().__init__()
+        self.events = queue.SimpleQueue() if events is None else events
+
+    def send(self, *events):
+        # One queue item per call, so a batch of events costs a single put
+        self.events.put(events)
+
+    def message(self, text, level='info'):
+        self.send(('message', text, level))
+
+    def progress(self, fraction, text):
+        self.send(('progress', fraction, text))
+
+    def drain(self):
+        """Return ``(messages, progress)`` queued since the last call.
+
+        ``messages`` is a list of ``(text, level)`` and ``progress`` the
+        latest ``(fraction, text)`` or None.
+        """
+        messages = []
+        latest = None
+        while True:
+            try:
+                events = self.events.get_nowait()
+            except queue.Empty:
+                break
+            for kind, first, second in events:
+                if kind == 'message':
+                    messages.append((first, second))
+                else:
+                    latest = (first, second)
+        return messages, latest
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from .series import DUPLICATE, FLATLINE, OK, SPIKE, SeaLevelSeries
+
+QC_ACTIONS = ('flag', 'drop')
+# Spikes: deviation from the centred rolling median, in robust standard deviations (scaled MAD)
+SPIKE_WINDOW = 15
+SPIKE_THRESHOLD = 6.0
+# Floor on the robust spread in metres, so sensor resolution steps on calm water are not spikes
+SPIKE_MIN_SPREAD = 0.01
+MAD_SCALE = 1.4826
+# Flatlines: at least this many consecutive identical readings
+FLATLINE_SAMPLES = 30
+
+
+def check_qc_options(options):
+    for key in ('duplicates', 'spikes', 'flatlines'):
+        if options.get(key, 'flag') not in QC_ACTIONS:
+            raise ValueError(f"Unknown QC action {options[key]!r} for {key}; expected one of {QC_ACTIONS}")
+
+
+def qc_options(qc):
+    # qc is False/None (no QC), True (defaults) or a dict of quality_control keyword arguments
+    if not qc:
+        return None
+    options = {} if qc is True else dict(qc)
+    check_qc_options(options)
+    return options
+
+
+def rolling_spikes(level, window=SPIKE_WINDOW, threshold=SPIKE_THRESHOLD, min_spread=SPIKE_MIN_SPREAD):
+    """Mask of samples further than ``threshold`` robust deviations from their rolling median.
+
+    The centred rolling median over ``window`` samples is the local level;
+    the spread is the scaled rolling median absolute deviation of the
+    residuals over the same window, at least ``min_spread``.
+    """
+    level = pd.Series(np.asarray(level, dtype=np.float64))
+    rolling = dict(window=window, center=True, min_periods=1)
+    residual = (level - level.rolling(**rolling).median()).abs()
+    spread = np.maximum(MAD_SCALE * residual.rolling(**rolling).median().to_numpy(), min_spread)
+    return residual.to_numpy() > threshold * spread
+
+
+def flatline_runs(level, min_samples=FLATLINE_SAMPLES):
+    """Mask of samples in runs of at least ``min_samples`` identical consecutive readings."""
+    level = np.asarray(level)
+    if len(level) == 0:
+        return np.zeros(0, dtype=bool)
+    change = np.flatnonzero(level[1:] != level[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [len(level)])))
+    return np.repeat(lengths >= min_samples, lengths)
+
+
+def quality_control(series, duplicates='drop', spikes='flag', flatlines='flag', spike_window=SPIKE_WINDOW,
+                    spike_threshold=SPIKE_THRESHOLD, spike_min_spread=SPIKE_MIN_SPREAD,
+                    flatline_samples=FLATLINE_SAMPLES, after=None):
+    """Check ``series`` before gap filling; return the checked series and a QC summary.
+
+    Out-of-order rows are re-sorted (stably, and only when some exist).
+    Repeated timestamps, and a first timestamp equal to ``after`` (the last
+    one already processed), are duplicates: the first reading is kept.
+    Spikes are found with ``rolling_spikes`` and flatlines with
+    ``flatline_runs``. Each of ``duplicates``, ``spikes`` and ``flatlines``
+    is 'flag' (keep the rows with the DUPLICATE, SPIKE or FLATLINE code) or
+    'drop'; dropped spikes and flatlines become gaps for the gap filler.
+    Only samples still flagged OK are flagged. The summary counts the rows
+    checked, out-of-order rows, duplicates, spikes, flatline samples and
+    dropped rows.
+    """
+    check_qc_options({'duplicates': duplicates, 'spikes': spikes, 'flatlines': flatlines})
+    epoch = series.epoch
+    descending = np.diff(epoch) < 0
+    out_of_order = int(np.count_nonzero(descending))
+    if out_of_order:
+        series = series[np.argsort(epoch, kind='stable')]
+        epoch = series.epoch
+
+    duplicate = np.zeros(len(series), dtype=bool)
+    duplicate[1:] = epoch[1:] == epoch[:-1]
+    if after is not None:
+        duplicate |= epoch == after
+    # Spikes and flatlines are looked for among the first reading of every timestamp
+    unique = np.flatnonzero(~duplicate)
+    level = series.level[unique]
+    spike = np.zeros(len(series), dtype=bool)
+    spike[unique] = rolling_spikes(level, spike_window, spike_threshold, spike_min_spread)
+    flatline = np.zeros(len(series), dtype=bool)
+    flatline[unique] = flatline_runs(level, flatline_samples) & ~spike[unique]
+
+    flag = series.flag.copy()
+    dropped = np.zeros(len(series), dtype=bool)
+    counts = {}
+    for name, mask, code, action in (('duplicates', duplicate, DUPLICATE, duplicates),
+                                     ('spikes', spike, SPIKE, spikes),
+                                     ('flatlines', flatline, FLATLINE, flatlines)):
+        mask &= flag == OK
+        counts[name] = int(np.count_nonzero(mask))
+        if action == 'drop':
+            dropped |= mask
+        else:
+            flag[mask] = code
+
+    checked = SeaLevelSeries(series.epoch, series.level, flag, series.std)
+    if dropped.any():
+        checked = checked[~dropped]
+    summary = {'rows': len(series), 'out_of_order': out_of_order, **counts,
+               'dropped': int(np.count_nonzero(dropped))}
+    return checked, summary
+
+
+def merge_qc_summaries(first, second):
+    # Summaries of consecutive chunks add up
+    if first is None:
+        return dict(second)
+    return {key: first[key] + second[key] for key in first}
+
+
+def format_qc_summary(summary):
+    return (f"QC: {summary['out_of_order']} out-of-order rows, {summary['duplicates']} duplicates, "
+            f"{summary['spikes']} spikes, {summary['flatlines']} flatline samples; "
+            f"{summary['dropped']} rows dropped.")
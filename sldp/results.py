@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import shutil
+
+from .catalog import catalog_path
+from .io_utils import atomic_write
+from .loader import file_digest
+
+RESULT_CACHE_ENV = 'SLDP_RESULT_CACHE'
+# Least recently used results are evicted once the cache holds more than this
+RESULT_CACHE_LIMIT = 2 << 30
+ENTRY_FILE = 'entry.json'
+# Lists the files of an output folder that are hard links into the cache
+LINKS_FILE = '.sldp-results.json'
+ENTRY_VERSION = 1
+
+
+def default_cache_folder():
+    return os.environ.get(RESULT_CACHE_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'sldp', 'results')
+
+
+def link_or_copy(source, target):
+    # Hard links cost nothing on the same file system; elsewhere the file is copied
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def record_links(output_folder, paths):
+    with atomic_write(os.path.join(output_folder, LINKS_FILE)) as handle:
+        json.dump(paths, handle)
+
+
+def release_links(output_folder):
+    """Give the files linked into the cache their own copy before a run rewrites them in place.
+
+    Writers truncate existing files, which would change the cached copy
+    through a shared hard link.
+    """
+    manifest = os.path.join(output_folder, LINKS_FILE)
+    try:
+        with open(manifest) as handle:
+            paths = json.load(handle)
+    except (OSError, ValueError):
+        return
+    for path in paths:
+        path = os.path.join(output_folder, path)
+        if os.path.isfile(path) and os.stat(path).st_nlink > 1:
+            shutil.copy2(path, path + '.tmp')
+            os.replace(path + '.tmp', path)
+    os.remove(manifest)
+
+
+def output_paths(summary, output_folder, catalog=None):
+    # Every file a run wrote into output_folder, relative to it
+    paths = list(summary['files']) + list((summary.get('products') or {}).values())
+    if catalog:
+        paths.append(catalog_path(output_folder, catalog))
+    if summary.get('preview'):
+        for name in sorted(os.listdir(summary['preview'])):
+            paths.append(os.path.join(summary['preview'], name))
+    return sorted({os.path.relpath(path, output_folder) for path in paths})
+
+
+def relocate(summary, source, target):
+    # The summary's paths under ``source`` moved to ``target``
+    def move(path):
+        return os.path.join(target, os.path.relpath(path, source))
+
+    summary = dict(summary)
+    summary['files'] = [move(path) for path in summary['files']]
+    if summary.get('products'):
+        summary['products'] = {name: move(path) for name, path in summary['products'].items()}
+    if summary.get('preview'):
+        summary['preview'] = move(summary['preview'])
+    return summary
+
+
+class ResultCache:
+    """Content-addressed cache of finished runs.
+
+    A run is keyed by the hash of the input bytes, the options that change
+    its outputs and the package version (see ``key``). ``store`` hard-links (or copies)
+    the output files of a run into ``folder/<key>`` with its summary;
+    ``restore`` links them back into an output folder, so an unchanged rerun
+    costs one read of the input. Restoring touches the entry, and ``store``
+    evicts the least recently used entries beyond ``limit`` bytes. The
+    size and mtime of every cached file are checked before it is restored.
+    ``folder`` defaults to ``$SLDP_RESULT_CACHE`` or ``~/.cache/sldp/results``.
+    """
+
+    def __init__(self, folder=None, limit=RESULT_CACHE_LIMIT):
+        self.folder = folder or default_cache_folder()
+        self.limit = limit
+
+    def key(self, input_file_path, options):
+        from . import __version__
+
+        # ``options`` must hold only what changes the outputs, not workers, profiling, ...
+        text = json.dumps({'version': __version__, 'input': file_digest(input_file_path), 'options': options},
+                          sort_keys=True, default=str)
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.folder, key)
+
+    def restore(self, key, output_folder):
+        """Link the outputs of entry ``key`` into ``output_folder``; return its summary, or None."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, ENTRY_FILE)) as handle:
+                stored = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        try:
+            valid = stored.get('version') == ENTRY_VERSION and all(
+                _file_stamp(os.path.join(entry, path)) == stamp for path, stamp in stored['paths'].items())
+        except OSError:
+            valid = False
+        if not valid:
+            # Missing or modified outputs: the entry is dropped and the run redone
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        for path in stored['paths']:
+            target = os.path.join(output_folder, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            link_or_copy(os.path.join(entry, path), target)
+        record_links(output_folder, list(stored['paths']))
+        os.utime(os.path.join(entry, ENTRY_FILE))
+        return relocate(stored['summary'], '.', output_folder)
+
+    def store(self, key, output_folder, summary, paths):
+        """Keep ``paths`` (relative to ``output_folder``) and ``summary`` under ``key``; return the entry folder."""
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return entry
+        # Built under a temporary name so a concurrent run never sees half an entry
+        temp = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(temp, ignore_errors=True)
+        stamps = {}
+        for path in paths:
+            target = os.path.join(temp, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            link_or_copy(os.path.join(output_folder, path), target)
+            stamps[path] = _file_stamp(target)
+        record_links(output_folder, paths)
+        summary = {name: value for name, value in summary.items() if name not in ('elapsed', 'timing')}
+        stored = {'version': ENTRY_VERSION, 'paths': stamps, 'summary': relocate(summary, output_folder, '.')}
+        with open(os.path.join(temp, ENTRY_FILE), 'w') as handle:
+            json.dump(stored, handle, indent=2, default=str)
+        try:
+            os.rename(temp, entry)
+        except OSError:
+            # Another run stored the same result first
+            shutil.rmtree(temp, ignore_errors=True)
+        self.prune()
+        return entry
+
+    def entries(self):
+        """Return ``(last_used, size, key)`` of every entry, least recently used first."""
+        entries = []
+        try:
+            keys = os.listdir(self.folder)
+        except OSError:
+            return entries
+        for key in keys:
+            entry = self._entry(key)
+            try:
+                last_used = os.stat(os.path.join(entry, ENTRY_FILE)).st_mtime
+            except OSError:
+                continue
+            size = sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, names in os.walk(entry) for name in names)
+            entries.append((last_used, size, key))
+        return sorted(entries)
+
+    def prune(self):
+        # Evicts least recently used entries until the cache fits in ``limit``; returns the keys removed
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, key in entries:
+            if total <= self.limit:
+                break
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
@@ -0,0 +1,32 @@
+import numpy as np
+
+from .gaps import ONE_MINUTE
+from .series import SeaLevelSeries
+
+
+def segment_bounds(timestamps, max_step=2 * ONE_MINUTE):
+    """Return ``(starts, stops)`` index arrays of the continuous segments.
+
+    A new segment starts wherever two consecutive timestamps are more than
+    ``max_step`` apart. ``timestamps`` must already be sorted.
+    """
+    times = np.asarray(timestamps, dtype='datetime64[ns]')
+    if len(times) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    breaks = np.flatnonzero(np.diff(times) > max_step) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(times)]))
+    return starts, stops
+
+
+def iter_segments(data, bounds=None, max_step=2 * ONE_MINUTE):
+    # Slices of a sorted series or frame are views, so no segment data is copied
+    if isinstance(data, SeaLevelSeries):
+        times, rows = data.times, data
+    else:
+        times, rows = data['timestamp'].to_numpy(), data.iloc
+    if bounds is None:
+        bounds = segment_bounds(times, max_step)
+    for start, stop in zip(*bounds):
+        yield rows[start:stop]
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Flag codes stored per sample; the labels are what the 'check' column shows on export
+OK = 0
+INTERPOLATED = 1
+DUPLICATE = 2
+SPIKE = 3
+FLATLINE = 4
+FLAG_LABELS = ('OK', 'Interpolated', 'Duplicate', 'Spike', 'Flatline')
+
+
+class SeaLevelSeries:
+    """Array-backed sea level samples used between loading and export.
+
+    ``epoch`` holds int64 nanoseconds since 1970 (a zero-copy datetime64[ns]
+    view is available as ``times``), ``level`` the sea levels as float64 or
+    float32 and ``flag`` one uint8 code from ``FLAG_LABELS`` per sample.
+    ``std`` is the optional interpolation uncertainty per sample (0 for
+    measured samples), exported as the 'interpolation_std' column.
+    Slices are views; pandas is only built by ``to_frame`` at the output.
+    """
+
+    __slots__ = ('epoch', 'level', 'flag', 'std')
+
+    def __init__(self, epoch, level, flag=None, std=None):
+        self.epoch = np.asarray(epoch, dtype=np.int64)
+        self.level = np.asarray(level)
+        if self.level.dtype not in (np.float32, np.float64):
+            self.level = self.level.astype(np.float64)
+        self.flag = np.zeros(len(self.epoch), dtype=np.uint8) if flag is None else np.asarray(flag, dtype=np.uint8)
+        self.std = None if std is None else np.asarray(std, dtype=np.float64)
+
+    @classmethod
+    def from_times(cls, times, level, flag=None, std=None):
+        return cls(np.asarray(times, dtype='datetime64[ns]').view(np.int64), level, flag, std)
+
+    @classmethod
+    def from_frame(cls, data):
+        """Build a series from a frame with 'timestamp', 'sea_level' and optional 'check' columns."""
+        flag = None
+        if 'check' in data:
+            flag = pd.Categorical(data['check'], categories=FLAG_LABELS).codes
+            if (flag < 0).any():
+                raise ValueError(f"Unknown check values; expected one of {', '.join(FLAG_LABELS)}")
+        std = data['interpolation_std'].to_numpy(dtype=float) if 'interpolation_std' in data else None
+        return cls.from_times(data['timestamp'].to_numpy(dtype='datetime64[ns]'),
+                              data['sea_level'].to_numpy(dtype=float), flag, std)
+
+    @classmethod
+    def concat(cls, parts):
+        std = None
+        if any(part.std is not None for part in parts):
+            # Parts without an uncertainty are measured samples
+            std = np.concatenate([part.std if part.std is not None else np.zeros(len(part)) for part in parts])
+        return cls(np.concatenate([part.epoch for part in parts]),
+                   np.concatenate([part.level for part in parts]),
+                   np.concatenate([part.flag for part in parts]), std)
+
+    @property
+    def times(self):
+        return self.epoch.view('datetime64[ns]')
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def __getitem__(self, index):
+        # Slices give views; integer arrays and masks give copies, as in numpy
+        if isinstance(index, int):
+            index = slice(index, index + 1 or None)
+        return SeaLevelSeries(self.epoch[index], self.level[index], self.flag[index],
+                              None if self.std is None else self.std[index])
+
+    def count(self, flag):
+        return int(np.count_nonzero(self.flag == flag))
+
+    def to_frame(self):
+        # The only place the samples become pandas objects; 'check' is categorical
+        frame = pd.DataFrame({
+            'timestamp': self.times,
+            'sea_level': self.level,
+            'check': pd.Categorical.from_codes(self.flag, categories=FLAG_LABELS),
+        })
+        if self.std is not None:
+            frame['interpolation_std'] = self.std
+        return frame
+
+
+def as_frame(data):
+    return data.to_frame() if isinstance(data, SeaLevelSeries) else data
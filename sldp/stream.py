@@ -0,0 +1,249 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .archive import RECORD_DTYPE, StationArchive, is_archive
+from .catalog import check_catalog_format, merge_stats, piece_stats, stats_to_catalog, write_catalog
+from .export import SegmentWriter, check_format
+from .gaps import fill_series, infer_interval, max_step, to_interval
+from .interpolation import make_interpolator
+from .loader import detect_timestamp_format, raw_to_series, read_raw
+from .profiling import StageTimer
+from .progress import logging_reporter
+from .qc import format_qc_summary, merge_qc_summaries, qc_options, quality_control
+from .segments import segment_bounds
+from .series import SeaLevelSeries
+
+DEFAULT_CHUNK_SIZE = 1000000
+
+
+class SegmentStream:
+    """Gap-fills and segments raw chunks as they arrive, writing segments incrementally.
+
+    The last row of each chunk is carried into the next one so gaps and
+    segment breaks across chunk boundaries are found. The open segment is
+    appended to as chunks arrive and closed as soon as it ends. ``resume``
+    continues from the state of an earlier run. Each chunk is checked by
+    ``quality_control`` (unless ``qc`` is False) before it is joined to the
+    carried row, so out-of-order rows are only re-sorted within a chunk.
+    Each step is timed on
+    ``timer`` (a ``StageTimer``).
+    """
+
+    def __init__(self, output_folder, reporter, interval=None, max_fill=1, num_simulations=1000, seed=None,
+                 expected=False, output_format='xlsx', single_file=False, timestamp_format=None, timer=None,
+                 interpolator='monte_carlo', uncertainty=False, qc=True):
+        self.output_folder = output_folder
+        self.reporter = reporter
+        self.timer = timer or StageTimer()
+        self.interval = to_interval(interval) if interval is not None else None
+        self.max_fill = max_fill
+        # One interpolator (and Monte Carlo generator) for the whole stream so chunks do not repeat draws
+        self.interpolator = make_interpolator(interpolator, num_simulations, seed, expected)
+        self.uncertainty = uncertainty
+        self.qc = qc_options(qc)
+        self.qc_summary = None
+        self.output_format = output_format
+        self.single_file = single_file
+        self.timestamp_format = timestamp_format
+
+        self.rows = self.interpolated = self.segments = 0
+        self.output_files = []
+        self.writer = None
+        self.carry = None
+        self.resumed_after = None
+        # Catalog statistics of the finished segments and of the one still open
+        self.closed_stats = []
+        self.open_stats = None
+        if single_file:
+            self.writer = SegmentWriter(os.path.join(output_folder, f"segments.{output_format}"), output_format)
+
+    def segment_path(self, segment_id):
+        return os.path.join(self.output_folder, f"segment_{segment_id}.{self.output_format}")
+
+    def resume(self, carry, segments, open_rows):
+        # carry is the last written row; the segment it belongs to is reopened for appending
+        self.carry = carry
+        self.resumed_after = carry.epoch[0]
+        self.segments = segments
+        if segments:
+            self.writer = SegmentWriter.reopen(self.segment_path(segments), self.output_format, open_rows)
+
+    def feed(self, chunk):
+        # The timestamp layout is detected once, on the first raw chunk
+        if self.timestamp_format is None:
+            self.timestamp_format = detect_timestamp_format(chunk['timestamp'])
+        with self.timer.stage('parse', len(chunk)):
+            series = raw_to_series(chunk, self.timestamp_format)
+        self.feed_series(series)
+
+    def feed_series(self, series):
+        if self.resumed_after is not None:
+            # Rows processed by the earlier run (re-read when the input changed) are skipped
+            series = series[series.epoch > self.resumed_after]
+            if len(series) == 0:
+                return
+        self.rows += len(series)
+        if self.qc is not None:
+            with self.timer.stage('qc', len(series)):
+                after = self.carry.epoch[-1] if self.carry is not None else None
+                series, summary = quality_control(series, after=after, **self.qc)
+            self.qc_summary = merge_qc_summaries(self.qc_summary, summary)
+            if len(series) == 0:
+                return
+        if self.carry is not None:
+            series = SeaLevelSeries.concat([self.carry, series])
+        if (np.diff(series.epoch) < 0).any():
+            raise ValueError("Streaming mode needs the input sorted by time")
+
+        if self.interval is None:
+            self.interval = infer_interval(series.times)
+            self.reporter.message(f"Sampling interval: {pd.Timedelta(self.interval).total_seconds():g} seconds.")
+
+        with self.timer.stage('gap_fill', len(series)):
+            filled = fill_series(series, self.interval, self.max_fill, interpolator=self.interpolator,
+                                 uncertainty=self.uncertainty)
+        self.interpolated += len(filled) - len(series)
+        with self.timer.stage('segment', len(filled)):
+            starts, stops = segment_bounds(filled.times, max_step(self.interval, self.max_fill))
+        continuing = self.carry is not None
+        if continuing:
+            # The carried row was already written with the open segment
+            starts[0] = 1
+        with self.timer.stage('catalog', len(filled)):
+            self._update_stats(piece_stats(filled, starts, stops).to_dict('records'), continuing and stops[0] > 1)
+
+        with self.timer.stage('export', len(filled)):
+            self._write_pieces(filled, starts, stops, continuing)
+        self.carry = filled[-1:]
+
+    def _write_pieces(self, filled, starts, stops, continuing):
+        for k, (start, stop) in enumerate(zip(starts, stops)):
+            # Every piece except the continuation of the open segment starts a new segment
+            if k > 0 or not continuing:
+                if self.writer is not None and not self.single_file:
+                    self._finish_segment()
+                self.segments += 1
+                if not self.single_file:
+                    self.writer = SegmentWriter(self.segment_path(self.segments), self.output_format)
+            segment = filled[start:stop]
+            if self.single_file:
+                segment = segment.to_frame().assign(segment_id=self.segments)
+            self.writer.write(segment)
+
+    def _update_stats(self, pieces, extends_open):
+        if extends_open:
+            piece = pieces.pop(0)
+            self.open_stats = merge_stats(self.open_stats, piece) if self.open_stats else piece
+        for piece in pieces:
+            if self.open_stats is not None:
+                self.closed_stats.append(self.open_stats)
+            self.open_stats = piece
+
+    def catalog(self):
+        # Only valid once the stream is closed
+        stats = self.closed_stats + ([self.open_stats] if self.open_stats is not None else [])
+        if self.single_file:
+            files = [self.writer.path] * len(stats)
+        else:
+            files = [self.segment_path(i) for i in range(1, len(stats) + 1)]
+        return stats_to_catalog(stats, files)
+
+    def close(self):
+        if self.writer is None:
+            return
+        if self.single_file:
+            self.writer.close()
+            if self.writer.rows:
+                self.output_files.append(self.writer.path)
+                self.reporter.message(f"Saved {self.segments} segments with {self.writer.rows} data points to "
+                                      f"{self.writer.path}", "success")
+        else:
+            self._finish_segment()
+
+    def _finish_segment(self):
+        self.writer.close()
+        self.reporter.message(f"Saved segment {self.segments} with {self.writer.rows} data points to "
+                              f"{self.writer.path}", "success")
+        self.output_files.append(self.writer.path)
+
+    def summary(self, input_file_path, started):
+        return {
+            'input': input_file_path,
+            'rows': self.rows,
+            'interpolated': self.interpolated,
+            'segments': self.segments,
+            'qc': self.qc_summary,
+            'files': self.output_files,
+            'elapsed': time.perf_counter() - started,
+        }
+
+
+def stream_file(stream, input_file_path, chunk_size=DEFAULT_CHUNK_SIZE, offset=0):
+    """Feed ``input_file_path`` from byte ``offset`` to ``stream``; return the end offset.
+
+    Text inputs are parsed chunk by chunk; station archives are read from
+    their memory map.
+    """
+    if is_archive(input_file_path):
+        archive = StationArchive(input_file_path)
+        first = max(0, offset - archive.record_offset(0)) // RECORD_DTYPE.itemsize
+        for chunk in stream.timer.iterate('read', archive.chunks(chunk_size, first)):
+            stream.feed_series(chunk)
+            stream.reporter.progress(0.05 + 0.9 * stream.rows / max(1, len(archive) - first),
+                                     f"Processed {stream.rows} data points")
+        return archive.record_offset(len(archive))
+
+    file_size = max(1, os.path.getsize(input_file_path))
+    with open(input_file_path, 'rb') as handle:
+        handle.seek(offset)
+        for chunk in stream.timer.iterate('read', read_raw(handle, chunksize=chunk_size)):
+            stream.feed(chunk)
+            fraction = min(handle.tell() / file_size, 1.0)
+            stream.reporter.progress(0.05 + fraction * 0.9, f"Processed {stream.rows} data points")
+        return handle.tell()
+
+
+def process_file_streaming(input_file_path, output_folder, reporter=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                           interval=None, max_fill=1, num_simulations=1000, seed=None, expected=False,
+                           output_format='xlsx', single_file=False, timestamp_format=None, catalog='csv',
+                           timer=None, interpolator='monte_carlo', uncertainty=False, qc=True):
+    """Streaming variant of ``process_file`` with constant peak memory.
+
+    The input is read ``chunk_size`` rows at a time through a
+    ``SegmentStream``, so segments are written as soon as they end. The input
+    must be sorted by time; when ``interval`` is None it is inferred from the
+    first chunk. Near chunk boundaries the context of the cubic and harmonic
+    ``interpolator`` is limited to the current chunk. The segment
+    ``catalog`` is built from statistics gathered
+    while streaming. Stages are timed on ``timer`` when given. Returns the
+    same summary as ``process_file``.
+    """
+    reporter = reporter or logging_reporter()
+    check_format(output_format, single_file)
+    check_catalog_format(catalog)
+    started = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+
+    reporter.message("Treatment started...")
+    reporter.message(f"Streaming input in chunks of {chunk_size} data points...")
+    stream = SegmentStream(output_folder, reporter, interval, max_fill, num_simulations, seed, expected,
+                           output_format, single_file, timestamp_format, timer, interpolator, uncertainty, qc)
+    stream_file(stream, input_file_path, chunk_size)
+    with stream.timer.stage('export'):
+        stream.close()
+    if catalog:
+        with stream.timer.stage('catalog'):
+            path = write_catalog(stream.catalog(), output_folder, catalog)
+        reporter.message(f"Wrote segment catalog to {path}", "success")
+
+    if stream.qc_summary is not None:
+        reporter.message(format_qc_summary(stream.qc_summary))
+    reporter.message(f"Interpolated {stream.interpolated} data points using {stream.interpolator.label}.",
+                     "success")
+    reporter.message(f"Identified {stream.segments} segments.", "success")
+    reporter.message("Treatment completed successfully!", "complete")
+    reporter.progress(1.0, "Completed")
+    return stream.summary(input_file_path, started)